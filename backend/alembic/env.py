@@ -3,7 +3,7 @@
 import asyncio
 from logging.config import fileConfig
 
-from sqlalchemy import pool
+from sqlalchemy import inspect, pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
@@ -60,9 +60,24 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+def clear_reflection_cache(ctx, **kwargs) -> None:
+    """Invalidate cached reflection after each revision, since its DDL changed the schema."""
+    inspector = ctx.connection.info.get("inspector")
+    if inspector is not None:
+        inspector.clear_cache()
+
+
 def do_run_migrations(connection: Connection) -> None:
     """Run migrations with the given connection."""
-    context.configure(connection=connection, target_metadata=target_metadata)
+    # Shared inspector so revisions reuse reflection results instead of re-querying
+    # the schema; revisions read it via op.get_bind().info["inspector"]
+    connection.info["inspector"] = inspect(connection)
+
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        on_version_apply=clear_reflection_cache,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
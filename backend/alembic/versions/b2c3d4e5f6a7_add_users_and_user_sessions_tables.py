@@ -77,6 +77,8 @@ def upgrade() -> None:
     op.create_index(op.f("ix_user_sessions_user_id"), "user_sessions", ["user_id"], unique=False)
 
     # Add user_id foreign key to messages table (using batch for SQLite)
+    # All operations in this block are applied in a single table rebuild on exit,
+    # so keep them together rather than splitting into several batch blocks.
     with op.batch_alter_table("messages", schema=None) as batch_op:
         batch_op.add_column(sa.Column("user_id", sa.Uuid(), nullable=True))
         batch_op.create_index(op.f("ix_messages_user_id"), ["user_id"], unique=False)
@@ -0,0 +1,34 @@
+"""Add partial index on users for report subscribers
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c9d0e1f2a3b4"
+down_revision: Union[str, None] = "b8c9d0e1f2a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Subscriber count/list filter on receive_reports = 1 and order by email
+    op.create_index(
+        "ix_users_receive_reports",
+        "users",
+        ["email"],
+        unique=False,
+        sqlite_where=sa.text("receive_reports = 1"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_receive_reports", table_name="users")
@@ -19,21 +19,20 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+def get_inspector() -> sa.Inspector:
+    """Get the migration run's cached inspector (see env.py)."""
+    conn = op.get_bind()
+    return conn.info.get("inspector") or sa.inspect(conn)
+
+
 def table_exists(table_name: str) -> bool:
     """Check if a table exists in the database."""
-    conn = op.get_bind()
-    result = conn.execute(
-        sa.text("SELECT name FROM sqlite_master WHERE type='table' AND name=:name"),
-        {"name": table_name},
-    )
-    return result.fetchone() is not None
+    return get_inspector().has_table(table_name)
 
 
 def column_exists(table_name: str, column_name: str) -> bool:
     """Check if a column exists in a table."""
-    conn = op.get_bind()
-    result = conn.execute(sa.text(f"PRAGMA table_info({table_name})"))
-    columns = [row[1] for row in result.fetchall()]
+    columns = {column["name"] for column in get_inspector().get_columns(table_name)}
     return column_name in columns
 
 
@@ -71,7 +70,12 @@ def upgrade() -> None:
                 server_default=sa.text("(CURRENT_TIMESTAMP)"),
                 nullable=False,
             ),
-            sa.ForeignKeyConstraint(["updated_by"], ["users.id"], ondelete="SET NULL"),
+            sa.ForeignKeyConstraint(
+                ["updated_by"],
+                ["users.id"],
+                name="fk_report_schedule_updated_by",
+                ondelete="SET NULL",
+            ),
             sa.PrimaryKeyConstraint("id"),
         )
 
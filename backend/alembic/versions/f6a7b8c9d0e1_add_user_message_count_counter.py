@@ -0,0 +1,76 @@
+"""Add users.message_count counter maintained by triggers on messages
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f6a7b8c9d0e1"
+down_revision: Union[str, None] = "e5f6a7b8c9d0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = {
+    "trg_messages_user_count_insert": """
+        CREATE TRIGGER trg_messages_user_count_insert
+        AFTER INSERT ON messages
+        WHEN NEW.sender = 'user' AND NEW.user_id IS NOT NULL
+        BEGIN
+            UPDATE users SET message_count = message_count + 1 WHERE id = NEW.user_id;
+        END
+    """,
+    "trg_messages_user_count_delete": """
+        CREATE TRIGGER trg_messages_user_count_delete
+        AFTER DELETE ON messages
+        WHEN OLD.sender = 'user' AND OLD.user_id IS NOT NULL
+        BEGIN
+            UPDATE users SET message_count = message_count - 1 WHERE id = OLD.user_id;
+        END
+    """,
+    "trg_messages_user_count_update": """
+        CREATE TRIGGER trg_messages_user_count_update
+        AFTER UPDATE OF user_id, sender ON messages
+        BEGIN
+            UPDATE users SET message_count = message_count - 1
+            WHERE OLD.sender = 'user' AND id = OLD.user_id;
+            UPDATE users SET message_count = message_count + 1
+            WHERE NEW.sender = 'user' AND id = NEW.user_id;
+        END
+    """,
+}
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("message_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # Backfill counts for existing messages
+    op.execute(
+        """
+        UPDATE users SET message_count = (
+            SELECT COUNT(*) FROM messages
+            WHERE messages.user_id = users.id AND messages.sender = 'user'
+        )
+        """
+    )
+
+    for trigger_sql in TRIGGERS.values():
+        op.execute(trigger_sql)
+
+
+def downgrade() -> None:
+    for trigger_name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.drop_column("message_count")
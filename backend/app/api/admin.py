@@ -1,27 +1,38 @@
 """Admin API endpoints for user management and statistics."""
 
+import asyncio
+import hashlib
 import logging
-from datetime import datetime, timedelta, timezone
+from collections.abc import Awaitable, Callable, Hashable
+from datetime import datetime, time, timedelta, timezone
+from time import monotonic
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import pydantic_core
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import and_, cast, func, select
+from sqlalchemy import and_, func, select, true, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.types import Date
 
-from app.database import get_db
+from app.database import async_session_maker, get_db
 from app.dependencies import require_admin
 from app.models.message import Message
 from app.models.report_schedule import ReportSchedule
 from app.models.user import User, UserRole
 from app.services.admin_report_service import AdminReportService
+from app.services.auth_service import invalidate_user_profile
+from app.services.scheduler_service import get_scheduler_status, reschedule_reports
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+# Rows fetched per database round-trip when streaming exports
+EXPORT_BATCH_SIZE = 1000
+
 
 # ============================================================================
 # Pydantic Models
@@ -178,18 +189,7 @@ class UserMessagesResponse(BaseModel):
 # ============================================================================
 
 
-async def get_user_message_count(db: AsyncSession, user_id: UUID) -> int:
-    """Get total message count for a user."""
-    result = await db.execute(
-        select(func.count(Message.id)).where(
-            Message.user_id == user_id,
-            Message.sender == "user",
-        )
-    )
-    return result.scalar() or 0
-
-
-async def user_to_detail_response(user: User, message_count: int) -> UserDetailResponse:
+async def user_to_detail_response(user: User) -> UserDetailResponse:
     """Convert user to detail response."""
     return UserDetailResponse(
         id=str(user.id),
@@ -202,12 +202,84 @@ async def user_to_detail_response(user: User, message_count: int) -> UserDetailR
         is_email_verified=user.is_email_verified,
         message_limit=user.message_limit,
         context_window_size=user.context_window_size,
-        message_count=message_count,
+        message_count=user.message_count,
         created_at=user.created_at.isoformat(),
         updated_at=user.updated_at.isoformat(),
     )
 
 
+def user_list_columns() -> tuple:
+    """Columns selected for user list rows."""
+    return (
+        User.id,
+        User.email,
+        User.display_name,
+        User.role,
+        User.provider,
+        User.is_blocked,
+        User.is_email_verified,
+        User.message_limit,
+        User.message_count,
+        User.created_at,
+        User.updated_at,
+    )
+
+
+def user_to_list_item(row) -> UserListItem:
+    """Convert a user list row to list item.
+
+    Skips validation: every field comes straight from typed model columns.
+    """
+    return UserListItem.model_construct(
+        id=str(row.id),
+        email=row.email,
+        display_name=row.display_name,
+        role=row.role,
+        provider=row.provider,
+        is_blocked=row.is_blocked,
+        is_email_verified=row.is_email_verified,
+        message_limit=row.message_limit,
+        message_count=row.message_count,
+        # Same isoformat() as the detail and update responses
+        created_at=row.created_at.isoformat(),
+        updated_at=row.updated_at.isoformat(),
+    )
+
+
+def with_etag(request: Request, response: Response, payload):
+    """Tag a read-only payload with a content ETag.
+
+    Returns an empty 304 when the client's If-None-Match already matches,
+    so polling dashboards skip the body.
+    """
+    etag = f'"{hashlib.blake2b(pydantic_core.to_json(payload), digest_size=16).hexdigest()}"'
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return payload
+
+
+def user_filters(search: str | None, role: str | None, blocked: bool | None) -> list:
+    """Build WHERE clauses for the admin user list filters."""
+    filters = []
+
+    if search:
+        search_pattern = f"%{search}%"
+        filters.append(
+            (User.email.ilike(search_pattern)) | (User.display_name.ilike(search_pattern))
+        )
+
+    if role:
+        filters.append(User.role == role)
+
+    if blocked is not None:
+        filters.append(User.is_blocked == blocked)
+
+    return filters
+
+
 # ============================================================================
 # Endpoints
 # ============================================================================
@@ -228,54 +300,34 @@ async def list_users(
 
     Admin only endpoint.
     """
-    # Build base query
-    query = select(User)
-
-    # Apply filters
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.where(
-            (User.email.ilike(search_pattern)) | (User.display_name.ilike(search_pattern))
-        )
+    filters = user_filters(search, role, blocked)
 
-    if role:
-        query = query.where(User.role == role)
+    # Build base query; message counts come from the trigger-maintained column
+    query = select(*user_list_columns()).where(*filters)
 
-    if blocked is not None:
-        query = query.where(User.is_blocked == blocked)
-
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-
-    # Apply pagination
+    # Apply pagination; the window count returns the filtered total with each row
     offset = (page - 1) * page_size
-    query = query.order_by(User.created_at.desc()).offset(offset).limit(page_size)
+    page_query = (
+        query.add_columns(func.count().over().label("total"))
+        .order_by(User.created_at.desc())
+        .offset(offset)
+        .limit(page_size)
+    )
 
     # Execute query
-    result = await db.execute(query)
-    users = result.scalars().all()
+    result = await db.execute(page_query)
+    rows = result.all()
 
-    # Get message counts for each user
-    user_items = []
-    for user in users:
-        message_count = await get_user_message_count(db, user.id)
-        user_items.append(
-            UserListItem(
-                id=str(user.id),
-                email=user.email,
-                display_name=user.display_name,
-                role=user.role,
-                provider=user.provider,
-                is_blocked=user.is_blocked,
-                is_email_verified=user.is_email_verified,
-                message_limit=user.message_limit,
-                message_count=message_count,
-                created_at=user.created_at.isoformat(),
-                updated_at=user.updated_at.isoformat(),
-            )
-        )
+    if rows:
+        total = rows[0].total
+    elif offset:
+        # Page is past the end, so no row carried the total
+        count_query = select(func.count()).select_from(User).where(*filters)
+        total = (await db.execute(count_query)).scalar() or 0
+    else:
+        total = 0
+
+    user_items = [user_to_list_item(row) for row in rows]
 
     total_pages = (total + page_size - 1) // page_size
 
@@ -288,6 +340,45 @@ async def list_users(
     )
 
 
+@router.get("/users/export")
+async def export_users(
+    admin: User = Depends(require_admin),
+    search: Annotated[str | None, Query(max_length=100)] = None,
+    role: Annotated[str | None, Query(pattern="^(user|unlimited|admin)$")] = None,
+    blocked: Annotated[bool | None, Query()] = None,
+):
+    """
+    Export all users matching the filters as JSON lines.
+
+    Rows are streamed from the database in batches instead of being
+    loaded into memory at once, so the export size is not bounded by page size.
+
+    Admin only endpoint.
+    """
+    query = (
+        select(*user_list_columns())
+        .where(*user_filters(search, role, blocked))
+        .order_by(User.created_at.desc())
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    async def generate():
+        # Own session: the request-scoped one may be closed while streaming
+        async with async_session_maker() as db:
+            rows = await db.stream(query)
+            async for row in rows:
+                item = user_to_list_item(row)
+                yield item.model_dump_json() + "\n"
+
+    logger.info(f"Admin {admin.email} exported users")
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.jsonl"'},
+    )
+
+
 @router.get("/users/{user_id}", response_model=UserDetailResponse)
 async def get_user(
     user_id: UUID,
@@ -299,8 +390,7 @@ async def get_user(
 
     Admin only endpoint.
     """
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -308,8 +398,7 @@ async def get_user(
             detail="User not found",
         )
 
-    message_count = await get_user_message_count(db, user.id)
-    return await user_to_detail_response(user, message_count)
+    return await user_to_detail_response(user)
 
 
 @router.patch("/users/{user_id}/role", response_model=AdminActionResponse)
@@ -324,8 +413,14 @@ async def update_user_role(
 
     Admin only endpoint.
     """
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    # Prevent admin from demoting themselves
+    if user_id == admin.id and data.role != UserRole.ADMIN.value:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot change your own role",
+        )
+
+    user = await db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -333,19 +428,13 @@ async def update_user_role(
             detail="User not found",
         )
 
-    # Prevent admin from demoting themselves
-    if user.id == admin.id and data.role != UserRole.ADMIN.value:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot change your own role",
-        )
-
     old_role = user.role
     user.role = data.role
+    # Set explicitly so the response needs no refresh round-trip
+    user.updated_at = datetime.now(timezone.utc)
     await db.commit()
-    await db.refresh(user)
+    invalidate_user_profile(user_id)
 
-    message_count = await get_user_message_count(db, user.id)
     logger.info(
         f"Admin {admin.email} changed role for user {user.email}: {old_role} -> {data.role}"
     )
@@ -353,7 +442,7 @@ async def update_user_role(
     return AdminActionResponse(
         success=True,
         message=f"Role updated from '{old_role}' to '{data.role}'",
-        user=await user_to_detail_response(user, message_count),
+        user=await user_to_detail_response(user),
     )
 
 
@@ -369,7 +458,20 @@ async def update_user_block_status(
 
     Admin only endpoint.
     """
-    result = await db.execute(select(User).where(User.id == user_id))
+    # Prevent admin from blocking themselves
+    if user_id == admin.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot block yourself",
+        )
+
+    # Single UPDATE ... RETURNING instead of loading the user first
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_blocked=data.is_blocked, updated_at=datetime.now(timezone.utc))
+        .returning(User)
+    )
     user = result.scalar_one_or_none()
 
     if not user:
@@ -378,25 +480,16 @@ async def update_user_block_status(
             detail="User not found",
         )
 
-    # Prevent admin from blocking themselves
-    if user.id == admin.id:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot block yourself",
-        )
-
-    user.is_blocked = data.is_blocked
     await db.commit()
-    await db.refresh(user)
+    invalidate_user_profile(user_id)
 
-    message_count = await get_user_message_count(db, user.id)
     action = "blocked" if data.is_blocked else "unblocked"
     logger.info(f"Admin {admin.email} {action} user {user.email}")
 
     return AdminActionResponse(
         success=True,
         message=f"User {action} successfully",
-        user=await user_to_detail_response(user, message_count),
+        user=await user_to_detail_response(user),
     )
 
 
@@ -414,8 +507,7 @@ async def update_user_message_limit(
 
     Admin only endpoint.
     """
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -425,10 +517,11 @@ async def update_user_message_limit(
 
     old_limit = user.message_limit
     user.message_limit = data.message_limit
+    # Set explicitly so the response needs no refresh round-trip
+    user.updated_at = datetime.now(timezone.utc)
     await db.commit()
-    await db.refresh(user)
+    invalidate_user_profile(user_id)
 
-    message_count = await get_user_message_count(db, user.id)
     limit_str = str(data.message_limit) if data.message_limit is not None else "default"
     old_limit_str = str(old_limit) if old_limit is not None else "default"
     logger.info(
@@ -439,7 +532,7 @@ async def update_user_message_limit(
     return AdminActionResponse(
         success=True,
         message=f"Message limit updated to {limit_str}",
-        user=await user_to_detail_response(user, message_count),
+        user=await user_to_detail_response(user),
     )
 
 
@@ -448,8 +541,44 @@ async def update_user_message_limit(
 # ============================================================================
 
 
+# Dashboard stats tolerate brief staleness, so repeated polls share one result
+STATS_CACHE_TTL_SECONDS = 30
+
+_stats_cache: dict[Hashable, tuple[float, BaseModel]] = {}
+# One lock per cache key, so the keys (and the locks) are bounded by the endpoints'
+# query parameters
+_stats_cache_locks: dict[Hashable, asyncio.Lock] = {}
+
+
+async def cached_stats(key: Hashable, compute: Callable[[], Awaitable[BaseModel]]) -> BaseModel:
+    """Return a cached stats response, recomputing it once it is older than the TTL.
+
+    Concurrent callers for the same key wait for a single recomputation;
+    other keys are not held up by it.
+    """
+    async with _stats_cache_locks.setdefault(key, asyncio.Lock()):
+        cached = _stats_cache.get(key)
+        if cached and cached[0] > monotonic():
+            return cached[1]
+
+        response = await compute()
+        _stats_cache[key] = (monotonic() + STATS_CACHE_TTL_SECONDS, response)
+        return response
+
+
+def clear_stats_cache():
+    """Drop all cached stats responses."""
+    _stats_cache.clear()
+    # Keep locks that are held so their waiters still share one recomputation
+    for key, lock in list(_stats_cache_locks.items()):
+        if not lock.locked():
+            del _stats_cache_locks[key]
+
+
 @router.get("/stats/summary", response_model=StatsSummaryResponse)
 async def get_stats_summary(
+    request: Request,
+    response: Response,
     admin: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db),
 ):
@@ -459,91 +588,64 @@ async def get_stats_summary(
     Returns total users, active users, message counts, etc.
     Admin only endpoint.
     """
+    summary = await cached_stats("summary", lambda: compute_stats_summary(db))
+    return with_etag(request, response, summary)
+
+
+async def compute_stats_summary(db: AsyncSession) -> StatsSummaryResponse:
+    """Compute summary statistics, bypassing the stats cache."""
     now = datetime.now(timezone.utc)
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     seven_days_ago = now - timedelta(days=7)
 
-    # Total users (excluding anonymous role)
-    total_users_result = await db.execute(
-        select(func.count(User.id)).where(User.role != UserRole.ANONYMOUS.value)
-    )
-    total_users = total_users_result.scalar() or 0
-
-    # Active users in last 7 days (users who sent messages)
-    active_users_result = await db.execute(
-        select(func.count(func.distinct(Message.user_id))).where(
-            and_(
-                Message.user_id.isnot(None),
-                Message.sender == "user",
-                Message.created_at >= seven_days_ago,
-            )
-        )
-    )
-    active_users_7d = active_users_result.scalar() or 0
-
-    # Total messages (user messages only)
-    total_messages_result = await db.execute(
-        select(func.count(Message.id)).where(Message.sender == "user")
-    )
-    total_messages = total_messages_result.scalar() or 0
-
-    # Messages today
-    messages_today_result = await db.execute(
-        select(func.count(Message.id)).where(
-            and_(
-                Message.sender == "user",
-                Message.created_at >= today_start,
-            )
-        )
-    )
-    messages_today = messages_today_result.scalar() or 0
-
-    # Messages in last 7 days
-    messages_7d_result = await db.execute(
-        select(func.count(Message.id)).where(
-            and_(
-                Message.sender == "user",
-                Message.created_at >= seven_days_ago,
-            )
+    # One scan per table: the date windows are FILTER clauses on shared aggregates
+    joined_today = User.created_at >= today_start
+    joined_7d = User.created_at >= seven_days_ago
+    user_stats = (
+        select(
+            func.count().label("total_users"),
+            func.count().filter(joined_today).label("new_users_today"),
+            func.count().filter(joined_7d).label("new_users_7d"),
         )
+        .where(User.role != UserRole.ANONYMOUS.value)
+        .subquery()
     )
-    messages_7d = messages_7d_result.scalar() or 0
 
-    # New users today
-    new_users_today_result = await db.execute(
-        select(func.count(User.id)).where(
-            and_(
-                User.role != UserRole.ANONYMOUS.value,
-                User.created_at >= today_start,
-            )
+    # User messages only; active users are distinct non-null senders in the window
+    sent_today = Message.created_at >= today_start
+    sent_7d = Message.created_at >= seven_days_ago
+    message_stats = (
+        select(
+            func.count().label("total_messages"),
+            func.count().filter(sent_today).label("messages_today"),
+            func.count().filter(sent_7d).label("messages_7d"),
+            func.count(func.distinct(Message.user_id)).filter(sent_7d).label("active_users_7d"),
         )
+        .where(Message.sender == "user")
+        .subquery()
     )
-    new_users_today = new_users_today_result.scalar() or 0
 
-    # New users in last 7 days
-    new_users_7d_result = await db.execute(
-        select(func.count(User.id)).where(
-            and_(
-                User.role != UserRole.ANONYMOUS.value,
-                User.created_at >= seven_days_ago,
-            )
-        )
+    # Both single-row aggregates come back in one round-trip
+    result = await db.execute(
+        select(user_stats, message_stats).join_from(user_stats, message_stats, true())
     )
-    new_users_7d = new_users_7d_result.scalar() or 0
+    row = result.one()
 
     return StatsSummaryResponse(
-        total_users=total_users,
-        active_users_7d=active_users_7d,
-        total_messages=total_messages,
-        messages_today=messages_today,
-        messages_7d=messages_7d,
-        new_users_today=new_users_today,
-        new_users_7d=new_users_7d,
+        total_users=row.total_users,
+        active_users_7d=row.active_users_7d,
+        total_messages=row.total_messages,
+        messages_today=row.messages_today,
+        messages_7d=row.messages_7d,
+        new_users_today=row.new_users_today,
+        new_users_7d=row.new_users_7d,
     )
 
 
 @router.get("/stats/daily-activity", response_model=DailyActivityResponse)
 async def get_daily_activity(
+    request: Request,
+    response: Response,
     admin: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db),
     days: Annotated[int, Query(ge=7, le=90)] = 30,
@@ -554,56 +656,58 @@ async def get_daily_activity(
     Returns message counts and new user registrations per day.
     Admin only endpoint.
     """
+    activity = await cached_stats(
+        ("daily_activity", days), lambda: compute_daily_activity(db, days)
+    )
+    return with_etag(request, response, activity)
+
+
+async def compute_daily_activity(db: AsyncSession, days: int) -> DailyActivityResponse:
+    """Compute daily activity for the last ``days`` days, bypassing the stats cache."""
     now = datetime.now(timezone.utc)
     start_date = (now - timedelta(days=days)).date()
+    start = datetime.combine(start_date, time.min, tzinfo=timezone.utc)
 
     # Get daily message counts
+    message_day = func.date(Message.created_at, type_=Date)
     messages_query = (
-        select(
-            cast(Message.created_at, Date).label("date"),
-            func.count(Message.id).label("count"),
-        )
+        select(message_day, func.count())
         .where(
             and_(
                 Message.sender == "user",
-                cast(Message.created_at, Date) >= start_date,
+                Message.created_at >= start,
             )
         )
-        .group_by(cast(Message.created_at, Date))
+        .group_by(message_day)
     )
     messages_result = await db.execute(messages_query)
-    messages_by_date = {row.date: row.count for row in messages_result}
+    messages_by_date = dict(messages_result.all())
 
     # Get daily new user counts
+    user_day = func.date(User.created_at, type_=Date)
     users_query = (
-        select(
-            cast(User.created_at, Date).label("date"),
-            func.count(User.id).label("count"),
-        )
+        select(user_day, func.count())
         .where(
             and_(
                 User.role != UserRole.ANONYMOUS.value,
-                cast(User.created_at, Date) >= start_date,
+                User.created_at >= start,
             )
         )
-        .group_by(cast(User.created_at, Date))
+        .group_by(user_day)
     )
     users_result = await db.execute(users_query)
-    users_by_date = {row.date: row.count for row in users_result}
+    users_by_date = dict(users_result.all())
 
     # Build response with all days (including zeros)
-    data = []
-    current_date = start_date
-    end_date = now.date()
-    while current_date <= end_date:
-        data.append(
-            DailyActivityItem(
-                date=current_date.isoformat(),
-                messages=messages_by_date.get(current_date, 0),
-                new_users=users_by_date.get(current_date, 0),
-            )
+    dates = [start_date + timedelta(days=i) for i in range((now.date() - start_date).days + 1)]
+    data = [
+        DailyActivityItem(
+            date=day.isoformat(),
+            messages=messages_by_date.get(day, 0),
+            new_users=users_by_date.get(day, 0),
         )
-        current_date += timedelta(days=1)
+        for day in dates
+    ]
 
     return DailyActivityResponse(days=days, data=data)
 
@@ -626,7 +730,7 @@ async def get_top_users(
     message_stats = (
         select(
             Message.user_id,
-            func.count(Message.id).label("message_count"),
+            func.count().label("message_count"),
             func.max(Message.created_at).label("last_message_at"),
         )
         .where(
@@ -643,7 +747,11 @@ async def get_top_users(
     # Join with users and order by message count
     query = (
         select(
-            User,
+            User.id,
+            User.email,
+            User.display_name,
+            User.role,
+            User.created_at,
             message_stats.c.message_count,
             message_stats.c.last_message_at,
         )
@@ -652,20 +760,20 @@ async def get_top_users(
         .limit(limit)
     )
 
-    result = await db.execute(query)
-    rows = result.all()
+    # Iterate the cursor directly rather than materializing all rows first
+    rows = await db.stream(query)
 
     users = [
         TopUserItem(
-            id=str(row.User.id),
-            email=row.User.email,
-            display_name=row.User.display_name,
-            role=row.User.role,
+            id=str(row.id),
+            email=row.email,
+            display_name=row.display_name,
+            role=row.role,
             message_count=row.message_count,
             last_message_at=row.last_message_at.isoformat() if row.last_message_at else None,
-            created_at=row.User.created_at.isoformat(),
+            created_at=row.created_at.isoformat(),
         )
-        for row in rows
+        async for row in rows
     ]
 
     return TopUsersResponse(users=users, total=len(users), days=days)
@@ -685,8 +793,7 @@ async def get_user_messages(
     Admin only endpoint for reviewing user conversations.
     """
     # Verify user exists
-    user_result = await db.execute(select(User).where(User.id == user_id))
-    user = user_result.scalar_one_or_none()
+    user = await db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -694,33 +801,42 @@ async def get_user_messages(
             detail="User not found",
         )
 
-    # Get total message count
-    count_result = await db.execute(
-        select(func.count(Message.id)).where(Message.user_id == user_id)
-    )
-    total = count_result.scalar() or 0
-
-    # Get paginated messages
+    # Get paginated messages, streamed so large contents are not all buffered twice;
+    # the window count returns the user's total message count with each row
     offset = (page - 1) * page_size
-    messages_result = await db.execute(
-        select(Message)
+    messages = await db.stream(
+        select(
+            Message.id,
+            Message.sender,
+            Message.content,
+            Message.created_at,
+            Message.session_id,
+            func.count().over().label("total"),
+        )
         .where(Message.user_id == user_id)
         .order_by(Message.created_at.desc())
         .offset(offset)
         .limit(page_size)
     )
-    messages = messages_result.scalars().all()
-
-    message_items = [
-        MessageItem(
-            id=str(msg.id),
-            sender=msg.sender,
-            content=msg.content,
-            created_at=msg.created_at.isoformat(),
-            session_id=str(msg.session_id),
+
+    total = 0
+    message_items = []
+    async for msg in messages:
+        total = msg.total
+        message_items.append(
+            MessageItem(
+                id=str(msg.id),
+                sender=msg.sender,
+                content=msg.content,
+                created_at=msg.created_at.isoformat(),
+                session_id=str(msg.session_id),
+            )
         )
-        for msg in messages
-    ]
+
+    if not message_items and offset:
+        # Page is past the end, so no row carried the total
+        count_result = await db.execute(select(func.count()).where(Message.user_id == user_id))
+        total = count_result.scalar() or 0
 
     total_pages = (total + page_size - 1) // page_size
 
@@ -807,6 +923,8 @@ async def send_admin_report(
 
 @router.get("/scheduler/status")
 async def get_scheduler_status_endpoint(
+    request: Request,
+    response: Response,
     admin: User = Depends(require_admin),
 ):
     """
@@ -817,9 +935,7 @@ async def get_scheduler_status_endpoint(
 
     Admin only endpoint.
     """
-    from app.services.scheduler_service import get_scheduler_status
-
-    return get_scheduler_status()
+    return with_etag(request, response, get_scheduler_status())
 
 
 # ============================================================================
@@ -850,8 +966,18 @@ class UpdateScheduleRequest(BaseModel):
     minute: int | None = Field(None, ge=0, le=59)
 
 
+async def count_report_subscribers(db: AsyncSession) -> int:
+    """Count users subscribed to reports."""
+    count_result = await db.execute(
+        select(func.count()).where(User.receive_reports == True)  # noqa: E712
+    )
+    return count_result.scalar() or 0
+
+
 @router.get("/reports/schedule", response_model=ReportScheduleResponse)
 async def get_report_schedule(
+    request: Request,
+    response: Response,
     admin: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db),
 ):
@@ -860,8 +986,6 @@ async def get_report_schedule(
 
     Admin only endpoint.
     """
-    from app.services.scheduler_service import get_scheduler_status
-
     # Get or create schedule record
     result = await db.execute(select(ReportSchedule).where(ReportSchedule.id == 1))
     schedule = result.scalar_one_or_none()
@@ -873,16 +997,12 @@ async def get_report_schedule(
         await db.commit()
         await db.refresh(schedule)
 
-    # Count users subscribed to reports
-    count_result = await db.execute(
-        select(func.count(User.id)).where(User.receive_reports == True)  # noqa: E712
-    )
-    subscribed_count = count_result.scalar() or 0
+    subscribed_count = await count_report_subscribers(db)
 
     # Get next run time from scheduler
     scheduler_status = get_scheduler_status()
 
-    return ReportScheduleResponse(
+    schedule_response = ReportScheduleResponse(
         enabled=schedule.enabled,
         schedule_type=schedule.schedule_type,
         day_of_week=schedule.day_of_week,
@@ -893,6 +1013,8 @@ async def get_report_schedule(
         subscribed_users_count=subscribed_count,
     )
 
+    return with_etag(request, response, schedule_response)
+
 
 @router.put("/reports/schedule", response_model=ReportScheduleResponse)
 async def update_report_schedule(
@@ -905,7 +1027,8 @@ async def update_report_schedule(
 
     Admin only endpoint.
     """
-    from app.services.scheduler_service import reschedule_reports
+    # Schedule changes never touch subscriptions, so count before updating
+    subscribed_count = await count_report_subscribers(db)
 
     # Get or create schedule record
     result = await db.execute(select(ReportSchedule).where(ReportSchedule.id == 1))
@@ -928,9 +1051,10 @@ async def update_report_schedule(
         schedule.minute = data.minute
 
     schedule.updated_by = admin.id
+    # Set explicitly so the response needs no refresh round-trip
+    schedule.updated_at = datetime.now(timezone.utc)
 
     await db.commit()
-    await db.refresh(schedule)
 
     # Reschedule the job with new settings
     reschedule_reports(schedule)
@@ -941,15 +1065,7 @@ async def update_report_schedule(
         f"day={schedule.day_of_week}, time={schedule.hour:02d}:{schedule.minute:02d}"
     )
 
-    # Count subscribed users
-    count_result = await db.execute(
-        select(func.count(User.id)).where(User.receive_reports == True)  # noqa: E712
-    )
-    subscribed_count = count_result.scalar() or 0
-
     # Get updated scheduler status
-    from app.services.scheduler_service import get_scheduler_status
-
     scheduler_status = get_scheduler_status()
 
     return ReportScheduleResponse(
@@ -987,6 +1103,8 @@ class ReportSubscribersResponse(BaseModel):
 
 @router.get("/reports/subscribers", response_model=ReportSubscribersResponse)
 async def get_report_subscribers(
+    request: Request,
+    response: Response,
     admin: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db),
 ):
@@ -1010,7 +1128,8 @@ async def get_report_subscribers(
         for user in users
     ]
 
-    return ReportSubscribersResponse(
-        subscribers=subscribers,
-        total=len(subscribers),
+    return with_etag(
+        request,
+        response,
+        ReportSubscribersResponse(subscribers=subscribers, total=len(subscribers)),
     )
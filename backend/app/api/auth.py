@@ -1,18 +1,36 @@
 """Authentication API endpoints for OAuth and token management."""
 
+import hmac
 import logging
 import secrets
 from typing import Annotated
 
-from fastapi import APIRouter, Cookie, Depends, HTTPException, Query, Request, Response
+import pydantic_core
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Cookie,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
 from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.responses import FastJSONResponse
 from app.config import settings
 from app.database import get_db
-from app.services.auth_service import AuthService
+from app.services.auth_service import (
+    AuthService,
+    cache_user_profile,
+    get_cached_user_profile,
+    invalidate_user_profile,
+)
+from app.services.email_service import email_service
 from app.services.jwt_service import jwt_service
-from app.services.oauth_service import oauth_service
+from app.services.oauth_service import SUPPORTED_PROVIDERS, oauth_service
 from app.services.password_service import validate_password_strength
 from app.services.verification_service import VerificationService
 
@@ -26,6 +44,34 @@ COOKIE_HTTPONLY = True
 COOKIE_SAMESITE = "lax"
 COOKIE_MAX_AGE_ACCESS = 30 * 60  # 30 minutes
 COOKIE_MAX_AGE_REFRESH = 7 * 24 * 60 * 60  # 7 days
+COOKIE_MAX_AGE_OAUTH_STATE = 10 * 60  # 10 minutes
+# Attributes shared by every auth cookie, formatted once at import
+COOKIE_ATTRIBUTES = (
+    ("; HttpOnly" if COOKIE_HTTPONLY else "")
+    + ("; Secure" if COOKIE_SECURE else "")
+    + f"; SameSite={COOKIE_SAMESITE}"
+)
+ACCESS_TOKEN_EXPIRES_IN = settings.jwt_access_token_expire_minutes * 60
+
+# OAuth URLs only depend on settings, so build them once.
+# Callbacks use the configured backend URL, not request.url_for, which
+# would give the Docker internal hostname.
+OAUTH_CALLBACK_URLS = {
+    provider: f"{settings.backend_url}/api/auth/{provider}/callback"
+    for provider in SUPPORTED_PROVIDERS
+}
+OAUTH_ERROR_URL = f"{settings.frontend_url}/login?error=oauth_failed"
+
+# Bodies that never change while the app runs, serialized once.
+# Providers are registered when oauth_service is created at import.
+PROVIDERS_BODY = pydantic_core.to_json({"providers": oauth_service.get_configured_providers()})
+AUTH_METHODS_BODY = pydantic_core.to_json(
+    {
+        "oauth_providers": oauth_service.get_configured_providers(),
+        "email_password_enabled": True,
+    }
+)
+UNAUTHENTICATED_BODY = pydantic_core.to_json({"user": None, "authenticated": False})
 
 
 class TokenResponse(BaseModel):
@@ -107,19 +153,101 @@ class UpdatePreferencesResponse(BaseModel):
     user: dict
 
 
+def is_frontend_redirect(url: str) -> bool:
+    """Check in constant time that a redirect URL starts with the frontend URL."""
+    prefix = settings.frontend_url
+    # Pad to the prefix length so a short URL doesn't exit early either
+    candidate = url[: len(prefix)].ljust(len(prefix), "\0")
+    return hmac.compare_digest(candidate.encode(), prefix.encode())
+
+
+def get_client_info(request: Request) -> tuple[str | None, str | None]:
+    """Read the User-Agent and client IP straight from the ASGI scope.
+
+    Skips building Starlette's Headers and Address objects for two values.
+    """
+    user_agent = None
+    for name, value in request.scope["headers"]:
+        if name == b"user-agent":
+            user_agent = value.decode("latin-1")
+            break
+    client = request.scope.get("client")
+    return user_agent, client[0] if client else None
+
+
+def build_cookie_header(name: str, value: str, max_age: int, path: str = "/") -> bytes:
+    """Format a Set-Cookie header value for an auth cookie.
+
+    Values are JWTs or URL-safe tokens, so they need no quoting.
+    """
+    return f"{name}={value}; Max-Age={max_age}; Path={path}{COOKIE_ATTRIBUTES}".encode("latin-1")
+
+
+def set_auth_cookies(response: Response, access_token: str, refresh_token: str) -> None:
+    """Append the access and refresh token cookies as pre-built Set-Cookie headers."""
+    access_cookie = build_cookie_header("access_token", access_token, COOKIE_MAX_AGE_ACCESS)
+    # Refresh token is only sent to auth endpoints
+    refresh_cookie = build_cookie_header(
+        "refresh_token", refresh_token, COOKIE_MAX_AGE_REFRESH, path="/api/auth"
+    )
+    response.raw_headers.extend([(b"set-cookie", access_cookie), (b"set-cookie", refresh_cookie)])
+
+
+# Expired auth cookies never change, so their headers are built once
+CLEAR_AUTH_COOKIE_HEADERS = (
+    (b"set-cookie", build_cookie_header("access_token", "", 0)),
+    (b"set-cookie", build_cookie_header("refresh_token", "", 0, path="/api/auth")),
+)
+
+
+def clear_auth_cookies(response: Response) -> None:
+    """Append pre-built headers that expire both auth cookies."""
+    response.raw_headers.extend(CLEAR_AUTH_COOKIE_HEADERS)
+
+
+CLEAR_OAUTH_STATE_COOKIE_HEADER = (
+    b"set-cookie",
+    build_cookie_header("oauth_state", "", 0, path="/api/auth"),
+)
+
+
+def oauth_redirect(location: str) -> Response:
+    """Build an OAuth callback redirect that also expires the single-use state cookie."""
+    response = Response(status_code=302)
+    response.raw_headers.extend(
+        [(b"location", location.encode("latin-1")), CLEAR_OAUTH_STATE_COOKIE_HEADER]
+    )
+    return response
+
+
+def token_response(access_token: str, refresh_token: str, user: dict) -> FastJSONResponse:
+    """Build a TokenResponse-shaped body and attach the auth cookies.
+
+    Returned directly, so FastAPI skips TokenResponse validation and never
+    merges the injected Response; the cookies must be set on this one.
+    """
+    response = FastJSONResponse(
+        {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "expires_in": ACCESS_TOKEN_EXPIRES_IN,
+            "user": user,
+        }
+    )
+    set_auth_cookies(response, access_token, refresh_token)
+    return response
+
+
 @router.get("/methods", response_model=AuthMethodsResponse)
 async def get_auth_methods():
     """Get all available authentication methods."""
-    return AuthMethodsResponse(
-        oauth_providers=oauth_service.get_configured_providers(),
-        email_password_enabled=True,
-    )
+    return Response(content=AUTH_METHODS_BODY, media_type="application/json")
 
 
 @router.get("/providers", response_model=ProvidersResponse)
 async def get_providers():
     """Get list of configured OAuth providers."""
-    return ProvidersResponse(providers=oauth_service.get_configured_providers())
+    return Response(content=PROVIDERS_BODY, media_type="application/json")
 
 
 @router.get("/me", response_model=UserResponse)
@@ -130,32 +258,39 @@ async def get_current_user(
 ):
     """
     Get current authenticated user.
+
+    Responses skip response-model validation; UserResponse documents the
+    shape. The unauthenticated body is pre-serialized, and profiles are
+    cached briefly per user and invalidated whenever the user changes.
     """
     if not access_token:
-        return UserResponse(user=None, authenticated=False)
+        return Response(content=UNAUTHENTICATED_BODY, media_type="application/json")
 
     user_id = jwt_service.get_user_id_from_token(access_token)
     if not user_id:
-        return UserResponse(user=None, authenticated=False)
+        return Response(content=UNAUTHENTICATED_BODY, media_type="application/json")
+
+    # Return blocked users as authenticated so they can see their status and log out
+    profile = get_cached_user_profile(user_id)
+    if profile is not None:
+        return FastJSONResponse({"user": profile, "authenticated": True})
 
     auth_service = AuthService(db)
     user = await auth_service.get_user_by_id(user_id)
 
     if not user:
-        return UserResponse(user=None, authenticated=False)
+        return Response(content=UNAUTHENTICATED_BODY, media_type="application/json")
 
-    # Return blocked users as authenticated so they can see their status and log out
-    return UserResponse(
-        user=user.to_dict(include_sensitive=True),
-        authenticated=True,
-    )
+    profile = user.to_dict(include_sensitive=True)
+    cache_user_profile(user_id, profile)
+    return FastJSONResponse({"user": profile, "authenticated": True})
 
 
 @router.post("/register", response_model=TokenResponse)
 async def register(
     request: Request,
-    response: Response,
     data: RegisterRequest,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -186,50 +321,31 @@ async def register(
     # Handle post-login tasks (admin promotion, etc.)
     await auth_service.handle_user_login(user)
 
-    # Send verification email (async, don't block registration)
+    # Create the verification token while the DB session is open, but send
+    # the email after the response so SMTP doesn't delay registration
     verification_service = VerificationService(db)
-    await verification_service.send_verification_email(user)
+    verification_url = await verification_service.create_verification_url(user)
+    background_tasks.add_task(
+        email_service.send_verification_email,
+        to_email=user.email,
+        verification_url=verification_url,
+        display_name=user.display_name,
+    )
 
     # Create auth session
-    user_agent = request.headers.get("User-Agent")
-    client_ip = request.client.host if request.client else None
+    user_agent, client_ip = get_client_info(request)
     access_token, refresh_token = await auth_service.create_auth_session(
         user=user,
         user_agent=user_agent,
         ip_address=client_ip,
     )
 
-    # Set cookies
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        max_age=COOKIE_MAX_AGE_ACCESS,
-        httponly=COOKIE_HTTPONLY,
-        secure=COOKIE_SECURE,
-        samesite=COOKIE_SAMESITE,
-    )
-
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        max_age=COOKIE_MAX_AGE_REFRESH,
-        httponly=COOKIE_HTTPONLY,
-        secure=COOKIE_SECURE,
-        samesite=COOKIE_SAMESITE,
-        path="/api/auth",
-    )
-
-    return TokenResponse(
-        access_token=access_token,
-        expires_in=settings.jwt_access_token_expire_minutes * 60,
-        user=user.to_dict(include_sensitive=True),
-    )
+    return token_response(access_token, refresh_token, user.to_dict(include_sensitive=True))
 
 
 @router.post("/login", response_model=TokenResponse)
 async def login(
     request: Request,
-    response: Response,
     data: LoginRequest,
     db: AsyncSession = Depends(get_db),
 ):
@@ -256,45 +372,21 @@ async def login(
     await auth_service.handle_user_login(user)
 
     # Create auth session
-    user_agent = request.headers.get("User-Agent")
-    client_ip = request.client.host if request.client else None
+    user_agent, client_ip = get_client_info(request)
     access_token, refresh_token = await auth_service.create_auth_session(
         user=user,
         user_agent=user_agent,
         ip_address=client_ip,
     )
 
-    # Set cookies
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        max_age=COOKIE_MAX_AGE_ACCESS,
-        httponly=COOKIE_HTTPONLY,
-        secure=COOKIE_SECURE,
-        samesite=COOKIE_SAMESITE,
-    )
-
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        max_age=COOKIE_MAX_AGE_REFRESH,
-        httponly=COOKIE_HTTPONLY,
-        secure=COOKIE_SECURE,
-        samesite=COOKIE_SAMESITE,
-        path="/api/auth",
-    )
-
-    return TokenResponse(
-        access_token=access_token,
-        expires_in=settings.jwt_access_token_expire_minutes * 60,
-        user=user.to_dict(include_sensitive=True),
-    )
+    return token_response(access_token, refresh_token, user.to_dict(include_sensitive=True))
 
 
 @router.get("/{provider}")
 async def oauth_login(
     provider: str,
     request: Request,
+    response: Response,
     redirect_url: str | None = Query(default=None),
 ):
     """
@@ -308,14 +400,19 @@ async def oauth_login(
     # Generate state for CSRF protection
     state = secrets.token_urlsafe(32)
 
-    # Store state in session (or use signed cookie)
-    # For simplicity, we'll encode the redirect URL in the state
-    if redirect_url:
-        state = f"{state}:{redirect_url}"
+    # Keep the state and redirect URL in a short-lived signed cookie,
+    # so neither travels through the provider in the query string
+    if redirect_url and not is_frontend_redirect(redirect_url):
+        redirect_url = None
+    state_token = jwt_service.create_oauth_state_token(
+        state, redirect_url, COOKIE_MAX_AGE_OAUTH_STATE
+    )
+    state_cookie = build_cookie_header(
+        "oauth_state", state_token, COOKIE_MAX_AGE_OAUTH_STATE, path="/api/auth"
+    )
+    response.raw_headers.append((b"set-cookie", state_cookie))
 
-    # Build callback URL using configured backend URL
-    # (not request.url_for which uses Docker internal hostname)
-    callback_url = f"{settings.backend_url}/api/auth/{provider}/callback"
+    callback_url = OAUTH_CALLBACK_URLS[provider]
 
     # Get authorization URL
     auth_url, _ = await oauth_service.get_authorization_url(
@@ -332,9 +429,9 @@ async def oauth_login(
 async def oauth_callback(
     provider: str,
     request: Request,
-    response: Response,
     code: str = Query(...),
     state: str = Query(default=""),
+    oauth_state: Annotated[str | None, Cookie()] = None,
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -345,9 +442,14 @@ async def oauth_callback(
     if not oauth_service.is_provider_configured(provider):
         raise HTTPException(status_code=400, detail=f"Provider '{provider}' is not configured")
 
-    # Build callback URL using configured backend URL
-    # (must match what was used in authorization request)
-    callback_url = f"{settings.backend_url}/api/auth/{provider}/callback"
+    # Verify the state against the signed cookie set by oauth_login
+    stored_state = jwt_service.verify_oauth_state_token(oauth_state, state) if oauth_state else None
+    if not stored_state:
+        logger.warning(f"OAuth callback with missing or mismatched state for {provider}")
+        return oauth_redirect(OAUTH_ERROR_URL)
+
+    # Must match the callback URL used in the authorization request
+    callback_url = OAUTH_CALLBACK_URLS[provider]
 
     try:
         # Exchange code for user info
@@ -359,11 +461,7 @@ async def oauth_callback(
     except Exception as e:
         logger.error(f"OAuth callback error: {e}", exc_info=True)
         # Redirect to frontend with error
-        error_redirect = f"{settings.frontend_url}/login?error=oauth_failed"
-        return Response(
-            status_code=302,
-            headers={"Location": error_redirect},
-        )
+        return oauth_redirect(OAUTH_ERROR_URL)
 
     # Get or create user
     auth_service = AuthService(db)
@@ -377,45 +475,19 @@ async def oauth_callback(
     await auth_service.handle_user_login(user)
 
     # Create auth session
-    user_agent = request.headers.get("User-Agent")
-    client_ip = request.client.host if request.client else None
+    user_agent, client_ip = get_client_info(request)
     access_token, refresh_token = await auth_service.create_auth_session(
         user=user,
         user_agent=user_agent,
         ip_address=client_ip,
     )
 
-    # Parse redirect URL from state
-    redirect_url = settings.frontend_url
-    if state and ":" in state:
-        _, custom_redirect = state.split(":", 1)
-        if custom_redirect.startswith(settings.frontend_url):
-            redirect_url = custom_redirect
+    # Redirect URL was checked against the frontend URL before it was signed
+    redirect_url = stored_state.get("redirect") or settings.frontend_url
 
     # Set tokens as HTTP-only cookies
-    response = Response(
-        status_code=302,
-        headers={"Location": redirect_url},
-    )
-
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        max_age=COOKIE_MAX_AGE_ACCESS,
-        httponly=COOKIE_HTTPONLY,
-        secure=COOKIE_SECURE,
-        samesite=COOKIE_SAMESITE,
-    )
-
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        max_age=COOKIE_MAX_AGE_REFRESH,
-        httponly=COOKIE_HTTPONLY,
-        secure=COOKIE_SECURE,
-        samesite=COOKIE_SAMESITE,
-        path="/api/auth",  # Only sent to auth endpoints
-    )
+    response = oauth_redirect(redirect_url)
+    set_auth_cookies(response, access_token, refresh_token)
 
     return response
 
@@ -423,7 +495,6 @@ async def oauth_callback(
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh_tokens(
     request: Request,
-    response: Response,
     refresh_token: Annotated[str | None, Cookie()] = None,
     db: AsyncSession = Depends(get_db),
 ):
@@ -436,8 +507,7 @@ async def refresh_tokens(
         raise HTTPException(status_code=401, detail="No refresh token provided")
 
     auth_service = AuthService(db)
-    user_agent = request.headers.get("User-Agent")
-    client_ip = request.client.host if request.client else None
+    user_agent, client_ip = get_client_info(request)
 
     result = await auth_service.refresh_tokens(
         refresh_token=refresh_token,
@@ -446,10 +516,13 @@ async def refresh_tokens(
     )
 
     if not result:
-        # Clear invalid cookies
-        response.delete_cookie("access_token")
-        response.delete_cookie("refresh_token", path="/api/auth")
-        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+        # Clear invalid cookies; returned rather than raised, since an
+        # HTTPException response would drop them
+        error_response = FastJSONResponse(
+            {"detail": "Invalid or expired refresh token"}, status_code=401
+        )
+        clear_auth_cookies(error_response)
+        return error_response
 
     new_access_token, new_refresh_token = result
 
@@ -457,30 +530,8 @@ async def refresh_tokens(
     user_id = jwt_service.get_user_id_from_token(new_access_token)
     user = await auth_service.get_user_by_id(user_id) if user_id else None
 
-    # Set new cookies
-    response.set_cookie(
-        key="access_token",
-        value=new_access_token,
-        max_age=COOKIE_MAX_AGE_ACCESS,
-        httponly=COOKIE_HTTPONLY,
-        secure=COOKIE_SECURE,
-        samesite=COOKIE_SAMESITE,
-    )
-
-    response.set_cookie(
-        key="refresh_token",
-        value=new_refresh_token,
-        max_age=COOKIE_MAX_AGE_REFRESH,
-        httponly=COOKIE_HTTPONLY,
-        secure=COOKIE_SECURE,
-        samesite=COOKIE_SAMESITE,
-        path="/api/auth",
-    )
-
-    return TokenResponse(
-        access_token=new_access_token,
-        expires_in=settings.jwt_access_token_expire_minutes * 60,
-        user=user.to_dict(include_sensitive=True) if user else {},
+    return token_response(
+        new_access_token, new_refresh_token, user.to_dict(include_sensitive=True) if user else {}
     )
 
 
@@ -497,9 +548,7 @@ async def logout(
         auth_service = AuthService(db)
         await auth_service.logout(refresh_token)
 
-    # Clear cookies
-    response.delete_cookie("access_token")
-    response.delete_cookie("refresh_token", path="/api/auth")
+    clear_auth_cookies(response)
 
     return {"message": "Logged out successfully"}
 
@@ -621,6 +670,7 @@ async def update_preferences(
     if updated:
         await db.commit()
         await db.refresh(user)
+        invalidate_user_profile(user.id)
 
     return UpdatePreferencesResponse(
         success=True,
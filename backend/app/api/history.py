@@ -5,6 +5,7 @@ import logging
 from fastapi import APIRouter, Query
 from pydantic import BaseModel
 
+from app.api.responses import FastJSONResponse
 from app.services.chat_service import chat_service
 
 logger = logging.getLogger(__name__)
@@ -30,7 +31,7 @@ class HistoryResponse(BaseModel):
 @router.get("/history", response_model=HistoryResponse)
 async def get_history(
     limit: int = Query(default=50, ge=1, le=100, description="Number of messages to return"),
-) -> HistoryResponse:
+) -> FastJSONResponse:
     """
     Get chat history from the default session.
 
@@ -41,7 +42,8 @@ async def get_history(
         limit: Maximum number of messages to return (1-100, default 50)
 
     Returns:
-        HistoryResponse with list of messages and count
+        JSON matching HistoryResponse, built from plain dicts without
+        response-model validation
     """
     # Get or create session and load history
     session_id, _ = await chat_service.get_or_create_session()
@@ -50,14 +52,14 @@ async def get_history(
     history = await chat_service.get_conversation_history(session_id, limit=limit)
 
     messages = [
-        MessageResponse(
-            type=msg.get("type", "message"),
-            sender=msg.get("sender", "unknown"),
-            content=msg.get("content", ""),
-        )
+        {
+            "type": msg.get("type", "message"),
+            "sender": msg.get("sender", "unknown"),
+            "content": msg.get("content", ""),
+        }
         for msg in history
     ]
 
     logger.info(f"Retrieved {len(messages)} messages from history")
 
-    return HistoryResponse(messages=messages, count=len(messages))
+    return FastJSONResponse({"messages": messages, "count": len(messages)})
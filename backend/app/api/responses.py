@@ -0,0 +1,18 @@
+"""Shared response classes for API routers."""
+
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by pydantic-core's Rust serializer.
+
+    Drop-in replacement for JSONResponse with the same compact output, but
+    serialized in Rust; also accepts Pydantic models, UUIDs and datetimes directly.
+    """
+
+    def render(self, content: Any) -> bytes:
+        """Serialize content to compact UTF-8 JSON."""
+        return pydantic_core.to_json(content)
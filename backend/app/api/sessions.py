@@ -3,8 +3,8 @@
 import logging
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, ConfigDict, Field
 
 from app.dependencies import get_or_create_user_id
 from app.services.chat_service import chat_service
@@ -15,6 +15,9 @@ router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
 
 # --- Request/Response Models ---
+# Response models are built with model_construct from dicts the chat service
+# produces, so their fields are not validated a second time. They are frozen
+# since nothing mutates them between construction and serialization.
 
 
 class SessionResponse(BaseModel):
@@ -26,6 +29,8 @@ class SessionResponse(BaseModel):
     created_at: str
     updated_at: str
 
+    model_config = ConfigDict(frozen=True)
+
 
 class SessionListResponse(BaseModel):
     """Response model for session list."""
@@ -35,6 +40,8 @@ class SessionListResponse(BaseModel):
     limit: int
     offset: int
 
+    model_config = ConfigDict(frozen=True)
+
 
 class CreateSessionRequest(BaseModel):
     """Request model for creating a session."""
@@ -55,6 +62,8 @@ class MessageResponse(BaseModel):
     sender: str
     content: str
 
+    model_config = ConfigDict(frozen=True)
+
 
 class SessionHistoryResponse(BaseModel):
     """Response model for session history."""
@@ -63,16 +72,7 @@ class SessionHistoryResponse(BaseModel):
     messages: list[MessageResponse]
     count: int
 
-
-# --- Dependency for user identification ---
-
-
-async def get_user_id(
-    request: Request,
-    response: Response,
-) -> str:
-    """Get or create user ID from cookie."""
-    return await get_or_create_user_id(request, response)
+    model_config = ConfigDict(frozen=True)
 
 
 # --- Endpoints ---
@@ -82,7 +82,7 @@ async def get_user_id(
 async def list_sessions(
     limit: int = Query(default=50, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
-    user_id: str = Depends(get_user_id),
+    user_id: str = Depends(get_or_create_user_id),
 ) -> SessionListResponse:
     """
     List all chat sessions for the current user.
@@ -96,7 +96,7 @@ async def list_sessions(
     )
 
     return SessionListResponse(
-        sessions=[SessionResponse(**s) for s in sessions],
+        sessions=[SessionResponse.model_construct(**s) for s in sessions],
         total=total,
         limit=limit,
         offset=offset,
@@ -106,7 +106,7 @@ async def list_sessions(
 @router.post("", response_model=SessionResponse, status_code=201)
 async def create_session(
     request: CreateSessionRequest,
-    user_id: str = Depends(get_user_id),
+    user_id: str = Depends(get_or_create_user_id),
 ) -> SessionResponse:
     """
     Create a new chat session for the current user.
@@ -118,13 +118,13 @@ async def create_session(
         title=request.title,
     )
 
-    return SessionResponse(**session)
+    return SessionResponse.model_construct(**session)
 
 
 @router.get("/{session_id}", response_model=SessionResponse)
 async def get_session(
     session_id: uuid.UUID,
-    user_id: str = Depends(get_user_id),
+    user_id: str = Depends(get_or_create_user_id),
 ) -> SessionResponse:
     """
     Get a specific session by ID for the current user.
@@ -136,14 +136,14 @@ async def get_session(
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    return SessionResponse(**session)
+    return SessionResponse.model_construct(**session)
 
 
 @router.patch("/{session_id}", response_model=SessionResponse)
 async def update_session(
     session_id: uuid.UUID,
     request: UpdateSessionRequest,
-    user_id: str = Depends(get_user_id),
+    user_id: str = Depends(get_or_create_user_id),
 ) -> SessionResponse:
     """
     Update a session's title for the current user.
@@ -155,13 +155,13 @@ async def update_session(
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    return SessionResponse(**session)
+    return SessionResponse.model_construct(**session)
 
 
 @router.delete("/{session_id}", status_code=204)
 async def delete_session(
     session_id: uuid.UUID,
-    user_id: str = Depends(get_user_id),
+    user_id: str = Depends(get_or_create_user_id),
 ) -> None:
     """
     Delete a session and all its messages for the current user.
@@ -169,34 +169,26 @@ async def delete_session(
     Returns 404 if session not found or doesn't belong to user.
     Returns 400 if attempting to delete the default session.
     """
-    # First check if session exists and belongs to user
-    session = await chat_service.get_session(user_id, session_id)
-
-    if session is None:
-        raise HTTPException(status_code=404, detail="Session not found")
-
-    # Check if it's the default session
-    if session.get("metadata", {}).get("is_default"):
-        raise HTTPException(status_code=400, detail="Cannot delete the default session")
-
-    deleted = await chat_service.delete_session(user_id, session_id)
+    deleted, reason = await chat_service.delete_session_unless_default(user_id, session_id)
 
     if not deleted:
-        raise HTTPException(status_code=400, detail="Failed to delete session")
+        if reason == "default":
+            raise HTTPException(status_code=400, detail="Cannot delete the default session")
+        raise HTTPException(status_code=404, detail="Session not found")
 
 
 @router.get("/{session_id}/history", response_model=SessionHistoryResponse)
 async def get_session_history(
     session_id: uuid.UUID,
     limit: int = Query(default=50, ge=1, le=100),
-    user_id: str = Depends(get_user_id),
+    user_id: str = Depends(get_or_create_user_id),
 ) -> SessionHistoryResponse:
     """
     Get conversation history for a specific session owned by the current user.
 
-    Returns messages ordered from oldest to newest.
+    Returns the most recent `limit` messages, ordered from oldest to newest.
     """
-    result = await chat_service.get_session_with_history(user_id, session_id)
+    result = await chat_service.get_session_with_history(user_id, session_id, limit=limit)
 
     if result is None:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -204,12 +196,12 @@ async def get_session_history(
     session_id, history = result
 
     messages = [
-        MessageResponse(
+        MessageResponse.model_construct(
             type=msg.get("type", "message"),
             sender=msg.get("sender", "unknown"),
             content=msg.get("content", ""),
         )
-        for msg in history[:limit]
+        for msg in history
     ]
 
     return SessionHistoryResponse(
@@ -1,9 +1,15 @@
 """WebSocket endpoints for real-time chat functionality."""
 
-import json
+import asyncio
 import logging
 import uuid
+from collections import deque
+from collections.abc import Coroutine, Iterable
+from itertools import islice
+from time import monotonic
+from typing import Any
 
+import pydantic_core
 from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
 
 from app.database import async_session_maker
@@ -18,19 +24,91 @@ logger = logging.getLogger(__name__)
 # Cookie name for JWT access token
 ACCESS_TOKEN_COOKIE = "access_token"
 
+# Messages kept per connection for AI context, and how many are sent to the AI
+HISTORY_MAX_MESSAGES = 50
+AI_CONTEXT_MESSAGES = 10
+
+# AI stream chunks are buffered and broadcast together once either limit is hit
+STREAM_FLUSH_CHUNKS = 8
+STREAM_FLUSH_SECONDS = 0.03
+
+# Outgoing frames buffered per connection; the oldest is dropped once full
+SEND_QUEUE_MAX_FRAMES = 64
+# How long a closing connection may take to deliver its queued frames
+SEND_DRAIN_TIMEOUT_SECONDS = 2.0
+# How long a disconnecting client's handler waits for its last messages to be saved
+SAVE_DRAIN_TIMEOUT_SECONDS = 5.0
+
 router = APIRouter()
 
 
+def encode_message(message: dict) -> str:
+    """Serialize an outgoing message to a JSON text frame with pydantic-core.
+
+    UUIDs and datetimes are serialized natively. The frontend parses text
+    frames, so the bytes are decoded once here and the same string is reused
+    for every recipient.
+    """
+    return pydantic_core.to_json(message).decode()
+
+
+# Frames whose content never changes, serialized once
+NO_USER_ID_FRAME = encode_message(
+    {
+        "type": "error",
+        "content": "No user identity. Please refresh the page.",
+        "error_code": "NO_USER_ID",
+    }
+)
+INVALID_FORMAT_FRAME = encode_message({"type": "error", "content": "Invalid message format"})
+TYPING_FRAME = encode_message({"type": "typing", "sender": "assistant", "is_typing": True})
+STREAM_END_FRAME = encode_message({"type": "ai_stream_end", "sender": "assistant"})
+
+# Fixed part of every AI stream frame; only the content varies per flush
+STREAM_CHUNK_PREFIX = '{"type":"ai_stream","sender":"assistant","content":'
+
+
+def encode_stream_chunk(content: str) -> str:
+    """Build an ai_stream frame by escaping only the chunk content."""
+    return STREAM_CHUNK_PREFIX + pydantic_core.to_json(content).decode() + "}"
+
+
+def recent_history(history: deque[tuple[str, str]], count: int) -> Iterable[tuple[str, str]]:
+    """Return a lazy view of the last `count` messages in a connection's history.
+
+    The view must be consumed before the history is appended to again.
+    """
+    return islice(history, max(0, len(history) - count), None)
+
+
+async def save_assistant_reply(
+    user_message_saved: asyncio.Task, session_id: uuid.UUID, content: str
+) -> None:
+    """Save an AI reply once the user message it answers has been saved."""
+    await user_message_saved
+    await chat_service.save_assistant_message(
+        session_id=session_id,
+        content=content,
+        meta={"provider": ai_service.provider, "model": ai_service.model},
+    )
+
+
 class ConnectionManager:
     """Manages WebSocket connections and message broadcasting."""
 
     def __init__(self):
-        # Map of session_id -> list of connections
-        self.session_connections: dict[uuid.UUID, list[WebSocket]] = {}
+        # Map of session_id -> set of connections (WebSockets hash by identity)
+        self.session_connections: dict[uuid.UUID, set[WebSocket]] = {}
         # Map of websocket -> (session_id, cookie_user_id, auth_user_id, conversation_history)
         self.connection_sessions: dict[
-            WebSocket, tuple[uuid.UUID, str, uuid.UUID | None, list[dict]]
+            WebSocket, tuple[uuid.UUID, str, uuid.UUID | None, deque[tuple[str, str]]]
         ] = {}
+        # Map of websocket -> outgoing frame queue, drained by a writer task per
+        # connection so a slow client never holds up broadcasts to the others
+        self.send_queues: dict[WebSocket, asyncio.Queue[str]] = {}
+        self.writer_tasks: dict[WebSocket, asyncio.Task] = {}
+        # Background database writes, referenced here until they finish
+        self.pending_tasks: set[asyncio.Task] = set()
 
     def register(
         self,
@@ -39,15 +117,33 @@ class ConnectionManager:
         cookie_user_id: str,
         auth_user_id: uuid.UUID | None,
         history: list[dict],
-    ):
-        """Register a WebSocket connection for a session (after accept)."""
+    ) -> deque[tuple[str, str]]:
+        """Register a WebSocket connection for a session (after accept).
+
+        Returns the connection's bounded conversation history as (sender, content)
+        pairs, which the caller appends to directly for the lifetime of the connection.
+        """
         # Track connection for this session
-        if session_id not in self.session_connections:
-            self.session_connections[session_id] = []
-        self.session_connections[session_id].append(websocket)
+        self.session_connections.setdefault(session_id, set()).add(websocket)
+
+        # Track session info for this connection; only sender and content are kept
+        # for AI context, and the deque drops the oldest messages itself once it
+        # holds HISTORY_MAX_MESSAGES
+        connection_history = deque(
+            ((message["sender"], message["content"]) for message in history),
+            maxlen=HISTORY_MAX_MESSAGES,
+        )
+        self.connection_sessions[websocket] = (
+            session_id,
+            cookie_user_id,
+            auth_user_id,
+            connection_history,
+        )
 
-        # Track session info for this connection
-        self.connection_sessions[websocket] = (session_id, cookie_user_id, auth_user_id, history)
+        # Start the writer that delivers this connection's queued frames
+        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=SEND_QUEUE_MAX_FRAMES)
+        self.send_queues[websocket] = queue
+        self.writer_tasks[websocket] = asyncio.create_task(self._writer(websocket, queue))
 
         user_display = (
             f"auth:{str(auth_user_id)[:8]}" if auth_user_id else f"anon:{cookie_user_id[:8]}"
@@ -57,6 +153,8 @@ class ConnectionManager:
             f"Session connections: {len(self.session_connections[session_id])}"
         )
 
+        return connection_history
+
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection."""
         if websocket in self.connection_sessions:
@@ -64,81 +162,145 @@ class ConnectionManager:
 
             # Remove from session connections
             if session_id in self.session_connections:
-                if websocket in self.session_connections[session_id]:
-                    self.session_connections[session_id].remove(websocket)
+                self.session_connections[session_id].discard(websocket)
 
-                # Clean up empty session lists
+                # Clean up empty session sets
                 if not self.session_connections[session_id]:
                     del self.session_connections[session_id]
 
             # Remove connection tracking
             del self.connection_sessions[websocket]
 
+            # Stop the writer; a writer disconnecting its own connection just returns
+            self.send_queues.pop(websocket, None)
+            writer_task = self.writer_tasks.pop(websocket, None)
+            if writer_task is not None and writer_task is not asyncio.current_task():
+                writer_task.cancel()
+
             logger.info(f"Connection closed for session {session_id}")
 
     async def broadcast_to_session(self, session_id: uuid.UUID, message: dict):
         """Broadcast a message to all connections in a session."""
-        message_json = json.dumps(message)
+        if session_id not in self.session_connections:
+            return
+
+        await self.broadcast_frame_to_session(session_id, encode_message(message))
 
+    async def broadcast_frame_to_session(self, session_id: uuid.UUID, message_json: str):
+        """Queue an already serialized JSON frame for all connections in a session."""
         if session_id not in self.session_connections:
             return
 
         for connection in self.session_connections[session_id]:
-            try:
-                await connection.send_text(message_json)
-            except Exception as e:
-                logger.error(f"Error broadcasting to connection: {e}")
+            self._enqueue(connection, message_json)
 
     async def send_to_client(self, websocket: WebSocket, message: dict):
         """Send a message to a specific client."""
+        await self.send_frame_to_client(websocket, encode_message(message))
+
+    async def send_frame_to_client(self, websocket: WebSocket, message_json: str):
+        """Send an already serialized JSON frame to a specific client."""
+        # Registered connections go through their queue to keep frames in order
+        if websocket in self.send_queues:
+            self._enqueue(websocket, message_json)
+            return
+
         try:
-            await websocket.send_text(json.dumps(message))
+            await websocket.send_text(message_json)
         except Exception as e:
             logger.error(f"Error sending to client: {e}")
 
+    def _enqueue(self, websocket: WebSocket, message_json: str):
+        """Queue a frame for a connection, dropping its oldest frame if the queue is full."""
+        queue = self.send_queues.get(websocket)
+        if queue is None:
+            return
+
+        try:
+            queue.put_nowait(message_json)
+        except asyncio.QueueFull:
+            queue.get_nowait()
+            queue.task_done()
+            queue.put_nowait(message_json)
+            logger.warning("Send queue full for slow client, dropped oldest frame")
+
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue[str]):
+        """Deliver queued frames to one connection until it fails or disconnects."""
+        while True:
+            message_json = await queue.get()
+            try:
+                await websocket.send_text(message_json)
+            except Exception as e:
+                logger.error(f"Error broadcasting to connection: {e}")
+                # Frames left behind will never be sent; release them so a pending
+                # flush_and_disconnect() doesn't wait out its timeout
+                while not queue.empty():
+                    queue.get_nowait()
+                    queue.task_done()
+                self.disconnect(websocket)
+                return
+            finally:
+                queue.task_done()
+
+    async def flush_and_disconnect(self, websocket: WebSocket):
+        """Let a connection's queued frames go out, then remove the connection."""
+        queue = self.send_queues.get(websocket)
+        if queue is not None:
+            try:
+                await asyncio.wait_for(queue.join(), SEND_DRAIN_TIMEOUT_SECONDS)
+            except TimeoutError:
+                logger.warning("Timed out delivering queued frames to closing connection")
+
+        self.disconnect(websocket)
+
+    def create_background_task(self, coro: Coroutine[Any, Any, None]) -> asyncio.Task:
+        """Run a coroutine as a task that is kept alive until it completes.
+
+        A task that fails has its error logged, even if nothing awaits it.
+        """
+        task = asyncio.create_task(coro)
+        self.pending_tasks.add(task)
+        task.add_done_callback(self._background_task_done)
+        return task
+
+    def _background_task_done(self, task: asyncio.Task):
+        """Forget a finished background task and log its error, if any."""
+        self.pending_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background task failed", exc_info=task.exception())
+
     def get_session_info(
         self, websocket: WebSocket
-    ) -> tuple[uuid.UUID, str, uuid.UUID | None, list[dict]] | None:
+    ) -> tuple[uuid.UUID, str, uuid.UUID | None, deque[tuple[str, str]]] | None:
         """Get session info for a connection."""
         return self.connection_sessions.get(websocket)
 
-    def add_to_history(self, websocket: WebSocket, message: dict):
-        """Add a message to the connection's conversation history."""
-        if websocket not in self.connection_sessions:
-            return
-
-        session_id, cookie_user_id, auth_user_id, history = self.connection_sessions[websocket]
-        history.append(message)
-
-        # Keep only last 50 messages for context
-        if len(history) > 50:
-            history = history[-50:]
 
-        self.connection_sessions[websocket] = (session_id, cookie_user_id, auth_user_id, history)
+manager = ConnectionManager()
 
 
-manager = ConnectionManager()
+# Limit exceeded notices, by user role
+VERIFICATION_REQUIRED_MESSAGE = (
+    "Please verify your email address to start chatting. "
+    "Check your inbox for the verification link!"
+)
+LIMIT_EXCEEDED_MESSAGES = {
+    "anonymous": (
+        "You've reached your message limit as an anonymous user. "
+        "Please sign in to continue chatting with more messages!"
+    ),
+    "user": (
+        "You've reached your message limit. Please contact us at dremdem.ru for extended access."
+    ),
+}
+DEFAULT_LIMIT_EXCEEDED_MESSAGE = "You've reached your message limit."
 
 
 def _get_limit_exceeded_message(user_role: str, requires_verification: bool = False) -> str:
     """Get the appropriate limit exceeded message based on user role."""
     if requires_verification:
-        return (
-            "Please verify your email address to start chatting. "
-            "Check your inbox for the verification link!"
-        )
-    elif user_role == "anonymous":
-        return (
-            "You've reached your message limit as an anonymous user. "
-            "Please sign in to continue chatting with more messages!"
-        )
-    elif user_role == "user":
-        return (
-            "You've reached your message limit. "
-            "Please contact us at dremdem.ru for extended access."
-        )
-    else:
-        return "You've reached your message limit."
+        return VERIFICATION_REQUIRED_MESSAGE
+    return LIMIT_EXCEEDED_MESSAGES.get(user_role, DEFAULT_LIMIT_EXCEEDED_MESSAGE)
 
 
 @router.websocket("/ws/chat")
@@ -168,6 +330,9 @@ async def websocket_endpoint(
     # if database calls fail or timeout.
     await websocket.accept()
 
+    # Background save of the latest turn's messages
+    reply_saved: asyncio.Task | None = None
+
     try:
         # Get cookie-based user_id (for anonymous users)
         cookie_user_id = websocket.cookies.get(USER_ID_COOKIE)
@@ -175,15 +340,7 @@ async def websocket_endpoint(
         if not cookie_user_id:
             # No user identity - close connection with error
             logger.warning("WebSocket connection attempted without user cookie")
-            await websocket.send_text(
-                json.dumps(
-                    {
-                        "type": "error",
-                        "content": "No user identity. Please refresh the page.",
-                        "error_code": "NO_USER_ID",
-                    }
-                )
-            )
+            await websocket.send_text(NO_USER_ID_FRAME)
             await websocket.close(code=4001, reason="No user identity")
             return
 
@@ -218,7 +375,9 @@ async def websocket_endpoint(
             )
 
         # Register connection (websocket already accepted above)
-        manager.register(websocket, actual_session_id, cookie_user_id, auth_user_id, history)
+        connection_history = manager.register(
+            websocket, actual_session_id, cookie_user_id, auth_user_id, history
+        )
 
         # Send connection confirmation with session info and limit info
         await manager.send_to_client(
@@ -226,7 +385,7 @@ async def websocket_endpoint(
             {
                 "type": "system",
                 "content": "Connected to chat server",
-                "session_id": str(actual_session_id),
+                "session_id": actual_session_id,
                 "timestamp": None,
                 "system_type": "connection",
                 "limit_info": limit_info.to_dict(),
@@ -239,163 +398,152 @@ async def websocket_endpoint(
                 websocket,
                 {
                     "type": "history",
-                    "session_id": str(actual_session_id),
+                    "session_id": actual_session_id,
                     "messages": history,
                 },
             )
 
         while True:
-            # Receive message from client
-            data = await websocket.receive_text()
+            # Receive message from client; text or binary frames carry the same JSON
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+            data = message.get("text")
+            if data is None:
+                data = message.get("bytes") or b""
 
             try:
-                message_data = json.loads(data)
-                content = message_data.get("content", "")
-
-                # Get current session info
-                session_info = manager.get_session_info(websocket)
-                if session_info is None:
-                    continue
-
-                (
-                    current_session_id,
-                    current_cookie_user_id,
-                    current_auth_user_id,
-                    current_history,
-                ) = session_info
-
-                # Check message limits before processing (use auth_user_id if authenticated)
-                async with async_session_maker() as db:
-                    limits_service = MessageLimitsService(db)
-                    can_send, limit_info = await limits_service.check_can_send(
-                        cookie_user_id=current_cookie_user_id,
-                        auth_user_id=current_auth_user_id,
-                    )
-
-                if not can_send:
-                    # Send limit exceeded notification
-                    await manager.send_to_client(
-                        websocket,
-                        {
-                            "type": "limit_exceeded",
-                            "content": _get_limit_exceeded_message(
-                                limit_info.user_role, limit_info.requires_verification
-                            ),
-                            "limit_info": limit_info.to_dict(),
-                            "login_required": limit_info.user_role == "anonymous",
-                            "verification_required": limit_info.requires_verification,
-                        },
-                    )
-                    continue
-
-                # Broadcast user message to all connections in this session
-                user_message = {
-                    "type": "message",
-                    "content": content,
-                    "sender": message_data.get("sender", "user"),
-                    "timestamp": message_data.get("timestamp"),
-                }
-                await manager.broadcast_to_session(current_session_id, user_message)
-
-                # Add to in-memory history
-                manager.add_to_history(websocket, user_message)
-
-                # Save user message to database (with auth user_id if authenticated)
-                await chat_service.save_user_message(
-                    session_id=current_session_id,
-                    content=content,
-                    user_id=current_auth_user_id,
+                message_data = pydantic_core.from_json(data)
+            except ValueError:
+                logger.error("Invalid JSON received")
+                await manager.send_frame_to_client(websocket, INVALID_FORMAT_FRAME)
+                continue
+
+            content = message_data.get("content", "")
+
+            # Let the previous turn's messages reach the database first, so the
+            # limit check counts them and the new messages are saved after them
+            if reply_saved is not None:
+                await reply_saved
+
+            # Check message limits before processing (use auth_user_id if authenticated)
+            async with async_session_maker() as db:
+                limits_service = MessageLimitsService(db)
+                can_send, limit_info = await limits_service.check_can_send(
+                    cookie_user_id=cookie_user_id,
+                    auth_user_id=auth_user_id,
                 )
 
-                # Send typing indicator to session
-                await manager.broadcast_to_session(
-                    current_session_id,
+            if not can_send:
+                # Send limit exceeded notification
+                await manager.send_to_client(
+                    websocket,
                     {
-                        "type": "typing",
-                        "sender": "assistant",
-                        "is_typing": True,
+                        "type": "limit_exceeded",
+                        "content": _get_limit_exceeded_message(
+                            limit_info.user_role, limit_info.requires_verification
+                        ),
+                        "limit_info": limit_info.to_dict(),
+                        "login_required": limit_info.user_role == "anonymous",
+                        "verification_required": limit_info.requires_verification,
                     },
                 )
+                continue
+
+            # Broadcast user message to all connections in this session
+            user_message = {
+                "type": "message",
+                "content": content,
+                "sender": message_data.get("sender", "user"),
+                "timestamp": message_data.get("timestamp"),
+            }
+            await manager.broadcast_to_session(actual_session_id, user_message)
+
+            # Add to in-memory history
+            connection_history.append((user_message["sender"], content))
+
+            # Save user message to database (with auth user_id if authenticated) while
+            # the AI response streams; the reply is saved after it so messages keep
+            # their order
+            user_message_saved = manager.create_background_task(
+                chat_service.save_user_message(
+                    session_id=actual_session_id,
+                    content=content,
+                    user_id=auth_user_id,
+                )
+            )
 
-                # Get updated history for context
-                session_info = manager.get_session_info(websocket)
-                _, _, _, current_history = session_info if session_info else (None, None, None, [])
-
-                # Generate AI response with streaming
-                ai_response_content = ""
-                async for chunk in ai_service.generate_response_stream(
-                    content,
-                    current_history[-10:],  # Last 10 messages for context
+            # Send typing indicator to session
+            await manager.broadcast_frame_to_session(actual_session_id, TYPING_FRAME)
+
+            # Generate AI response with streaming, using the last few messages of
+            # the updated history as context; the AI service reads them before
+            # its first await, so nothing is appended while the view is in use
+            context = recent_history(connection_history, AI_CONTEXT_MESSAGES)
+            response_parts: list[str] = []
+            pending_chunks: list[str] = []
+            last_flush = monotonic()
+            async for chunk in ai_service.generate_response_stream(content, context):
+                response_parts.append(chunk)
+                pending_chunks.append(chunk)
+
+                # Send buffered chunks to all clients in session as one frame
+                if (
+                    len(pending_chunks) >= STREAM_FLUSH_CHUNKS
+                    or monotonic() - last_flush >= STREAM_FLUSH_SECONDS
                 ):
-                    ai_response_content += chunk
-
-                    # Send streaming chunk to all clients in session
-                    await manager.broadcast_to_session(
-                        current_session_id,
-                        {
-                            "type": "ai_stream",
-                            "content": chunk,
-                            "sender": "assistant",
-                        },
+                    await manager.broadcast_frame_to_session(
+                        actual_session_id, encode_stream_chunk("".join(pending_chunks))
                     )
+                    pending_chunks.clear()
+                    last_flush = monotonic()
 
-                # Send stream end signal
-                await manager.broadcast_to_session(
-                    current_session_id,
-                    {
-                        "type": "ai_stream_end",
-                        "sender": "assistant",
-                    },
+            # Flush whatever is left before ending the stream
+            if pending_chunks:
+                await manager.broadcast_frame_to_session(
+                    actual_session_id, encode_stream_chunk("".join(pending_chunks))
                 )
 
-                # Add complete AI response to in-memory history
-                ai_message = {
-                    "type": "message",
-                    "content": ai_response_content,
-                    "sender": "assistant",
-                    "timestamp": None,
-                }
-                manager.add_to_history(websocket, ai_message)
-
-                # Save AI response to database
-                await chat_service.save_assistant_message(
-                    session_id=current_session_id,
-                    content=ai_response_content,
-                    meta={"provider": ai_service.provider, "model": ai_service.model},
-                )
+            # Send stream end signal
+            await manager.broadcast_frame_to_session(actual_session_id, STREAM_END_FRAME)
+            ai_response_content = "".join(response_parts)
 
-                # Send updated limit info after message exchange
-                async with async_session_maker() as db:
-                    limits_service = MessageLimitsService(db)
-                    updated_limit_info = await limits_service.get_limit_info(
-                        cookie_user_id=current_cookie_user_id,
-                        auth_user_id=current_auth_user_id,
-                    )
+            # Add complete AI response to in-memory history
+            connection_history.append(("assistant", ai_response_content))
 
-                await manager.send_to_client(
-                    websocket,
-                    {
-                        "type": "limit_update",
-                        "limit_info": updated_limit_info.to_dict(),
-                    },
-                )
+            # Save AI response to database in the background, so the limit update
+            # and the next message don't wait on the write
+            reply_saved = manager.create_background_task(
+                save_assistant_reply(user_message_saved, actual_session_id, ai_response_content)
+            )
 
-            except json.JSONDecodeError:
-                logger.error("Invalid JSON received")
-                await websocket.send_text(
-                    json.dumps({"type": "error", "content": "Invalid message format"})
-                )
+            # Send updated limit info after message exchange; the saved user message
+            # is the only change since the check above, so no new query is needed
+            await manager.send_to_client(
+                websocket,
+                {
+                    "type": "limit_update",
+                    "limit_info": limit_info.after_message_sent().to_dict(),
+                },
+            )
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
         logger.info("Client disconnected normally")
+        # Finish saving the last exchange before the handler returns; shielded so
+        # cancelling the handler doesn't cancel the write
+        if reply_saved is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(reply_saved), SAVE_DRAIN_TIMEOUT_SECONDS)
+            except TimeoutError:
+                logger.warning("Timed out saving messages for disconnected client")
+            except Exception as e:
+                logger.error(f"Failed to save messages for disconnected client: {e}")
     except Exception as e:
         logger.error(f"WebSocket error: {e}", exc_info=True)
-        # Try to send error message to client before closing
-        try:
-            await websocket.send_text(
-                json.dumps({"type": "error", "content": f"Server error: {str(e)}"})
-            )
-        except Exception:
-            pass  # Client may already be disconnected
-        manager.disconnect(websocket)
+        # Queue the error message behind any pending frames and let them all go
+        # out before closing; sending fails quietly if the client is already gone
+        await manager.send_to_client(
+            websocket, {"type": "error", "content": f"Server error: {str(e)}"}
+        )
+        await manager.flush_and_disconnect(websocket)
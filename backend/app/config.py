@@ -34,6 +34,8 @@ class Settings(BaseSettings):
     # Database Configuration
     database_path: str = "data/chat.db"  # Relative to project root
     database_echo: bool = False  # Enable SQL logging for debugging
+    database_pool_size: int = 20  # Persistent connections kept in the pool
+    database_max_overflow: int = 10  # Extra connections allowed under burst load
 
     # OAuth Configuration
     google_client_id: str = ""
@@ -18,11 +18,14 @@ from app.models.session import ChatSession  # noqa: F401
 from app.models.user import User  # noqa: F401
 from app.models.user_session import UserSession  # noqa: F401
 
-# Create async engine
+# Create async engine; connections are pooled and reused across requests
+# and WebSocket messages instead of opening the database file each time
 engine: AsyncEngine = create_async_engine(
     settings.database_url,
     echo=settings.database_echo,
     future=True,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
 )
 
 # Create async session factory
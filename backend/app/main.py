@@ -7,6 +7,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import admin, auth, history, sessions, websocket
+from app.api.responses import FastJSONResponse
 from app.config import settings
 from app.database import close_db, init_db
 from app.services.scheduler_service import start_scheduler, stop_scheduler
@@ -42,6 +43,7 @@ app = FastAPI(
     description="A simple, straightforward AI-powered chat application",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Configure CORS from settings
@@ -2,14 +2,22 @@
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, func
+from sqlalchemy import DateTime, MetaData, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+# Deterministic foreign key names, so migrations can drop them by name. Matches the
+# names the migrations already use (e.g. fk_messages_user_id); primary keys and unique
+# constraints stay unnamed, as the migrations create them.
+NAMING_CONVENTION = {
+    "ix": "ix_%(column_0_label)s",
+    "fk": "fk_%(table_name)s_%(column_0_name)s",
+}
+
 
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy models."""
 
-    pass
+    metadata = MetaData(naming_convention=NAMING_CONVENTION)
 
 
 class TimestampMixin:
@@ -3,7 +3,7 @@
 import uuid
 from typing import TYPE_CHECKING
 
-from sqlalchemy import JSON, ForeignKey, String, Text, Uuid
+from sqlalchemy import DDL, JSON, ForeignKey, Index, String, Text, Uuid, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -21,6 +21,12 @@ class Message(Base, TimestampMixin):
     """
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # Covers admin message counts (user_id = ? AND sender = 'user')
+        Index("ix_messages_user_sender", "user_id", "sender"),
+        # Covers admin stats (sender = 'user' AND created_at >= ?), incl. user_id reads
+        Index("ix_messages_sender_created_user", "sender", "created_at", "user_id"),
+    )
 
     # Primary key
     id: Mapped[uuid.UUID] = mapped_column(
@@ -92,3 +98,37 @@ class Message(Base, TimestampMixin):
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
         }
+
+
+# Triggers keeping users.message_count in sync with the user's sent messages
+USER_MESSAGE_COUNT_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_messages_user_count_insert
+    AFTER INSERT ON messages
+    WHEN NEW.sender = 'user' AND NEW.user_id IS NOT NULL
+    BEGIN
+        UPDATE users SET message_count = message_count + 1 WHERE id = NEW.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_messages_user_count_delete
+    AFTER DELETE ON messages
+    WHEN OLD.sender = 'user' AND OLD.user_id IS NOT NULL
+    BEGIN
+        UPDATE users SET message_count = message_count - 1 WHERE id = OLD.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_messages_user_count_update
+    AFTER UPDATE OF user_id, sender ON messages
+    BEGIN
+        UPDATE users SET message_count = message_count - 1
+        WHERE OLD.sender = 'user' AND id = OLD.user_id;
+        UPDATE users SET message_count = message_count + 1
+        WHERE NEW.sender = 'user' AND id = NEW.user_id;
+    END
+    """,
+)
+
+for _trigger in USER_MESSAGE_COUNT_TRIGGERS:
+    event.listen(Message.__table__, "after_create", DDL(_trigger).execute_if(dialect="sqlite"))
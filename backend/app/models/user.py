@@ -4,7 +4,7 @@ import uuid
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Boolean, Integer, String, Uuid
+from sqlalchemy import Boolean, Index, Integer, String, Uuid, desc, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -40,6 +40,12 @@ class User(Base, TimestampMixin):
     """
 
     __tablename__ = "users"
+    __table_args__ = (
+        # Serves the admin user list (ORDER BY created_at DESC LIMIT/OFFSET)
+        Index("ix_users_created_at", desc("created_at")),
+        # Report subscribers are a small subset; serves their count and email-ordered list
+        Index("ix_users_receive_reports", "email", sqlite_where=text("receive_reports = 1")),
+    )
 
     # Primary key
     id: Mapped[uuid.UUID] = mapped_column(
@@ -127,6 +133,14 @@ class User(Base, TimestampMixin):
         default=False,
     )
 
+    # Number of messages sent by this user (maintained by triggers on messages)
+    message_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+
     # Relationships
     auth_sessions: Mapped[list["UserSession"]] = relationship(
         "UserSession",
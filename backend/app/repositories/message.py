@@ -168,12 +168,19 @@ class MessageRepository(BaseRepository[Message]):
         Returns:
             List of message dictionaries for AI context
         """
-        messages = await self.get_recent(session_id, limit)
+        # Only the two columns the history needs, newest first, then reversed
+        # to chronological order
+        result = await self.session.execute(
+            select(Message.sender, Message.content)
+            .where(Message.session_id == session_id)
+            .order_by(Message.created_at.desc())
+            .limit(limit)
+        )
         return [
             {
                 "type": "message",
-                "sender": msg.sender,
-                "content": msg.content,
+                "sender": sender,
+                "content": content,
             }
-            for msg in messages
+            for sender, content in reversed(result.all())
         ]
@@ -2,7 +2,7 @@
 
 import logging
 import os
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Iterable
 
 from litellm import acompletion
 
@@ -50,14 +50,15 @@ class AIService:
         return bool(key_map.get(self.provider, False))
 
     async def generate_response_stream(
-        self, message: str, conversation_history: list[dict] | None = None
+        self, message: str, conversation_history: Iterable[tuple[str, str]] | None = None
     ) -> AsyncGenerator[str, None]:
         """
         Generate a streaming response from the AI.
 
         Args:
             message: The user's message
-            conversation_history: Optional list of previous messages for context
+            conversation_history: Optional previous (sender, content) pairs for context,
+                iterated once
 
         Yields:
             Chunks of the AI's response as they are generated
@@ -76,9 +77,9 @@ class AIService:
 
             # Add conversation history if provided
             if conversation_history:
-                for msg in conversation_history:
-                    role = "user" if msg.get("sender") == "user" else "assistant"
-                    messages.append({"role": role, "content": msg.get("content", "")})
+                for sender, content in conversation_history:
+                    role = "user" if sender == "user" else "assistant"
+                    messages.append({"role": role, "content": content})
 
             # Add current message
             messages.append({"role": "user", "content": message})
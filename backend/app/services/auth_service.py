@@ -1,8 +1,10 @@
 """Authentication service for user management."""
 
+import asyncio
 import logging
 import uuid
 from datetime import datetime, timezone
+from time import monotonic
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -16,6 +18,36 @@ from app.services.password_service import hash_password, verify_password
 
 logger = logging.getLogger(__name__)
 
+USER_PROFILE_TTL_SECONDS = 30
+USER_PROFILE_CACHE_MAX_SIZE = 5000
+
+# user_id -> (expires_at, profile dict served by /me)
+_user_profiles: dict[uuid.UUID, tuple[float, dict]] = {}
+
+
+def get_cached_user_profile(user_id: uuid.UUID) -> dict | None:
+    """Return the cached /me profile for a user, or None if missing or expired."""
+    entry = _user_profiles.get(user_id)
+    if entry is None:
+        return None
+    expires_at, profile = entry
+    if expires_at <= monotonic():
+        _user_profiles.pop(user_id, None)
+        return None
+    return profile
+
+
+def cache_user_profile(user_id: uuid.UUID, profile: dict) -> None:
+    """Cache a user's /me profile, evicting the oldest entry when full."""
+    if user_id not in _user_profiles and len(_user_profiles) >= USER_PROFILE_CACHE_MAX_SIZE:
+        _user_profiles.pop(next(iter(_user_profiles)))
+    _user_profiles[user_id] = (monotonic() + USER_PROFILE_TTL_SECONDS, profile)
+
+
+def invalidate_user_profile(user_id: uuid.UUID) -> None:
+    """Drop a user's cached profile after their data changes."""
+    _user_profiles.pop(user_id, None)
+
 
 class AuthService:
     """Service for handling user authentication and session management."""
@@ -94,6 +126,9 @@ class AuthService:
         Args:
             user: The user who just logged in.
         """
+        # Login may have refreshed OAuth profile fields
+        invalidate_user_profile(user.id)
+
         # Check for initial admin promotion
         if (
             settings.initial_admin_email
@@ -224,8 +259,10 @@ class AuthService:
         session = result.scalar_one_or_none()
 
         if session:
+            user_id = session.user_id
             await self.db.delete(session)
             await self.db.commit()
+            invalidate_user_profile(user_id)
             return True
 
         return False
@@ -286,11 +323,14 @@ class AuthService:
             logger.warning(f"Registration failed: email already exists: {email}")
             return None
 
+        # bcrypt is deliberately slow, so hash off the event loop
+        password_hash = await asyncio.to_thread(hash_password, password)
+
         # Create new user with hashed password
         user = User(
             id=uuid.uuid4(),
             email=email,
-            password_hash=hash_password(password),
+            password_hash=password_hash,
             provider="email",
             display_name=display_name or email.split("@")[0],
             role=UserRole.USER.value,
@@ -330,7 +370,7 @@ class AuthService:
             logger.warning(f"Login failed: no password set for user: {email}")
             return None
 
-        if not verify_password(password, user.password_hash):
+        if not await asyncio.to_thread(verify_password, password, user.password_hash):
             logger.warning(f"Login failed: invalid password for user: {email}")
             return None
 
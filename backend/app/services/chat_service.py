@@ -259,6 +259,7 @@ class ChatService:
         self,
         user_id: str,
         session_id: uuid.UUID,
+        limit: int = 50,
     ) -> tuple[uuid.UUID, list[dict]] | None:
         """
         Get a session with its conversation history for a user.
@@ -266,6 +267,7 @@ class ChatService:
         Args:
             user_id: The user's unique identifier
             session_id: The session UUID
+            limit: Maximum number of most recent messages to return
 
         Returns:
             Tuple of (session_id, history) or None if not found/not owned
@@ -278,7 +280,7 @@ class ChatService:
             if not await session_repo.belongs_to_user(session_id, user_id):
                 return None
 
-            history = await message_repo.to_conversation_history(session_id, limit=50)
+            history = await message_repo.to_conversation_history(session_id, limit=limit)
 
             logger.info(f"Session {session_id}: loaded {len(history)} messages")
 
@@ -318,42 +320,43 @@ class ChatService:
 
             return session.to_dict()
 
-    async def delete_session(
+    async def delete_session_unless_default(
         self,
         user_id: str,
         session_id: uuid.UUID,
-    ) -> bool:
+    ) -> tuple[bool, str | None]:
         """
-        Delete a session and all its messages for a user.
+        Delete a session and all its messages for a user, unless it is the default session.
 
-        Note: Cannot delete the default session.
+        The session row is loaded once and used for both the ownership and the
+        default-session checks before it is deleted.
 
         Args:
             user_id: The user's unique identifier
             session_id: The session UUID
 
         Returns:
-            True if deleted, False if not found, not owned, or is default session
+            Tuple of (deleted, reason); reason is "not_found" if the session
+            doesn't exist or isn't owned, "default" for the default session,
+            and None when deleted
         """
         async with async_session_maker() as db:
             session_repo = SessionRepository(db)
 
-            # Verify session belongs to user
-            if not await session_repo.belongs_to_user(session_id, user_id):
-                return False
+            session = await session_repo.get_by_id(session_id)
+            if session is None or session.user_id != user_id:
+                return False, "not_found"
 
-            # Check if this is the default session
-            if await session_repo.is_default_session(session_id):
+            if session.meta.get("is_default", False) is True:
                 logger.warning(f"Attempted to delete default session {session_id}")
-                return False
+                return False, "default"
 
-            deleted = await session_repo.delete(session_id)
+            await db.delete(session)
             await db.commit()
 
-            if deleted:
-                logger.info(f"Deleted session {session_id}")
+            logger.info(f"Deleted session {session_id}")
 
-            return deleted
+            return True, None
 
     async def validate_session_ownership(
         self,
@@ -1,5 +1,6 @@
 """Email service for sending verification and notification emails."""
 
+import asyncio
 import logging
 import smtplib
 from email.mime.multipart import MIMEMultipart
@@ -59,16 +60,8 @@ class EmailService:
             # Attach HTML version
             msg.attach(MIMEText(html_body, "html"))
 
-            # Send via SMTP
-            if settings.smtp_use_tls:
-                server = smtplib.SMTP(settings.smtp_host, settings.smtp_port)
-                server.starttls()
-            else:
-                server = smtplib.SMTP_SSL(settings.smtp_host, settings.smtp_port)
-
-            server.login(settings.smtp_user, settings.smtp_password)
-            server.sendmail(settings.smtp_from_email, to_email, msg.as_string())
-            server.quit()
+            # smtplib blocks, so run the SMTP exchange off the event loop
+            await asyncio.to_thread(self._send_smtp, to_email, msg.as_string())
 
             logger.info(f"Email sent successfully to {to_email}")
             return True
@@ -77,6 +70,19 @@ class EmailService:
             logger.error(f"Failed to send email to {to_email}: {e}")
             return False
 
+    @staticmethod
+    def _send_smtp(to_email: str, message: str) -> None:
+        """Deliver a formatted message over SMTP (blocking)."""
+        if settings.smtp_use_tls:
+            server = smtplib.SMTP(settings.smtp_host, settings.smtp_port)
+            server.starttls()
+        else:
+            server = smtplib.SMTP_SSL(settings.smtp_host, settings.smtp_port)
+
+        server.login(settings.smtp_user, settings.smtp_password)
+        server.sendmail(settings.smtp_from_email, to_email, message)
+        server.quit()
+
     async def send_verification_email(
         self,
         to_email: str,
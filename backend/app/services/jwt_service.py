@@ -1,7 +1,9 @@
 """JWT token service for authentication."""
 
 import hashlib
+import hmac
 import secrets
+import time
 import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Any
@@ -10,6 +12,9 @@ from jose import JWTError, jwt
 
 from app.config import settings
 
+# Decoded access tokens kept in memory; the oldest entry is evicted when full
+TOKEN_CACHE_MAX_SIZE = 8192
+
 
 class JWTService:
     """Service for creating and validating JWT tokens."""
@@ -20,6 +25,8 @@ class JWTService:
         self.algorithm = settings.jwt_algorithm
         self.access_token_expire_minutes = settings.jwt_access_token_expire_minutes
         self.refresh_token_expire_days = settings.jwt_refresh_token_expire_days
+        # Raw token -> (user ID, expiry timestamp), so repeat requests skip decoding
+        self._token_cache: dict[str, tuple[uuid.UUID, float]] = {}
 
     def create_access_token(
         self,
@@ -93,6 +100,51 @@ class JWTService:
         except JWTError:
             return None
 
+    def create_oauth_state_token(
+        self, state: str, redirect_url: str | None, expires_in_seconds: int
+    ) -> str:
+        """
+        Create a signed token binding an OAuth state to its post-login redirect.
+
+        Args:
+            state: The random state sent to the OAuth provider.
+            redirect_url: Where to send the user after login, if not the default.
+            expires_in_seconds: Token lifetime in seconds.
+
+        Returns:
+            Encoded JWT for the oauth_state cookie.
+        """
+        payload = {
+            "state": state,
+            "redirect": redirect_url,
+            "type": "oauth_state",
+            "exp": datetime.now(timezone.utc) + timedelta(seconds=expires_in_seconds),
+        }
+        return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+
+    def verify_oauth_state_token(self, token: str, state: str) -> dict[str, Any] | None:
+        """
+        Verify an oauth_state cookie against the state returned by the provider.
+
+        Args:
+            token: The signed oauth_state cookie value.
+            state: The state query parameter from the OAuth callback.
+
+        Returns:
+            Token payload if valid and the states match, None otherwise.
+        """
+        try:
+            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except JWTError:
+            return None
+
+        if payload.get("type") != "oauth_state":
+            return None
+        if not hmac.compare_digest(str(payload.get("state", "")).encode(), state.encode()):
+            return None
+
+        return payload
+
     def verify_refresh_token(self, raw_token: str, stored_hash: str) -> bool:
         """
         Verify a refresh token against its stored hash.
@@ -104,7 +156,7 @@ class JWTService:
         Returns:
             True if the token matches, False otherwise.
         """
-        return self._hash_token(raw_token) == stored_hash
+        return hmac.compare_digest(self._hash_token(raw_token), stored_hash)
 
     def _hash_token(self, token: str) -> str:
         """
@@ -122,20 +174,38 @@ class JWTService:
         """
         Extract user ID from an access token.
 
+        Valid tokens are cached until they expire, so the signature is
+        verified once per token rather than once per request.
+
         Args:
             token: The JWT access token.
 
         Returns:
             User UUID if valid, None otherwise.
         """
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            user_id, expires_at = cached
+            if time.time() < expires_at:
+                return user_id
+            del self._token_cache[token]
+
         payload = self.verify_access_token(token)
         if payload and "sub" in payload:
             try:
-                return uuid.UUID(payload["sub"])
+                user_id = uuid.UUID(payload["sub"])
             except ValueError:
                 return None
+            self._cache_token(token, user_id, payload["exp"])
+            return user_id
         return None
 
+    def _cache_token(self, token: str, user_id: uuid.UUID, expires_at: float):
+        """Remember a verified token until its expiry, evicting the oldest entry if full."""
+        if len(self._token_cache) >= TOKEN_CACHE_MAX_SIZE:
+            del self._token_cache[next(iter(self._token_cache))]
+        self._token_cache[token] = (user_id, expires_at)
+
 
 # Global instance
 jwt_service = JWTService()
@@ -1,7 +1,7 @@
 """Message limits service for tracking and enforcing message quotas."""
 
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from uuid import UUID
 
 from sqlalchemy import func, select
@@ -45,6 +45,20 @@ class MessageLimitInfo:
             "requires_verification": self.requires_verification,
         }
 
+    def after_message_sent(self) -> "MessageLimitInfo":
+        """Return the limit info as it stands once one more user message is saved."""
+        used = self.used + 1
+        if self.is_unlimited:
+            return replace(self, used=used)
+
+        remaining = max(0, self.limit - used)
+        return replace(
+            self,
+            used=used,
+            remaining=remaining,
+            can_send=remaining > 0 and not self.requires_verification,
+        )
+
 
 class MessageLimitsService:
     """Service for tracking and enforcing message limits."""
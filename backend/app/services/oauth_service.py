@@ -11,6 +11,8 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+SUPPORTED_PROVIDERS = ("google", "github", "facebook")
+
 
 @dataclass
 class OAuthUserInfo:
@@ -81,7 +83,7 @@ class OAuthService:
     def get_configured_providers(self) -> list[str]:
         """Get list of configured OAuth providers."""
         providers = []
-        for provider in ["google", "github", "facebook"]:
+        for provider in SUPPORTED_PROVIDERS:
             if self.is_provider_configured(provider):
                 providers.append(provider)
         return providers
@@ -1,5 +1,7 @@
 """Password hashing and verification service using bcrypt."""
 
+import re
+
 import bcrypt
 
 
@@ -39,6 +41,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 MIN_PASSWORD_LENGTH = 8
 MAX_PASSWORD_LENGTH = 72  # bcrypt limit
 
+# Single-pass check for passwords that meet every rule below. It only looks for
+# ASCII letters and digits, which str.isalpha/isdigit always accept, so it never
+# lets through a password the step-by-step checks would reject; anything else
+# (including non-ASCII letters) goes through those checks
+VALID_PASSWORD_PATTERN = re.compile(
+    rf"(?=.*[A-Za-z])(?=.*[0-9]).{{{MIN_PASSWORD_LENGTH},{MAX_PASSWORD_LENGTH}}}", re.DOTALL
+)
+
 
 def validate_password_strength(password: str) -> tuple[bool, str | None]:
     """
@@ -51,6 +61,9 @@ def validate_password_strength(password: str) -> tuple[bool, str | None]:
         Tuple of (is_valid, error_message).
         error_message is None if valid.
     """
+    if VALID_PASSWORD_PATTERN.fullmatch(password):
+        return True, None
+
     if len(password) < MIN_PASSWORD_LENGTH:
         return False, f"Password must be at least {MIN_PASSWORD_LENGTH} characters"
 
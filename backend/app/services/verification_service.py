@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.models.email_verification import EmailVerificationToken
 from app.models.user import User
+from app.services.auth_service import invalidate_user_profile
 from app.services.email_service import email_service
 
 logger = logging.getLogger(__name__)
@@ -114,6 +115,7 @@ class VerificationService:
         user.is_email_verified = True
 
         await self.db.commit()
+        invalidate_user_profile(user.id)
 
         # Refresh user to reload attributes after commit
         # This prevents MissingGreenlet error when accessing expired attributes
@@ -123,6 +125,19 @@ class VerificationService:
 
         return user
 
+    async def create_verification_url(self, user: User) -> str:
+        """
+        Create a new verification token and build its verification link.
+
+        Args:
+            user: The user to create a link for.
+
+        Returns:
+            Full URL the user opens to verify their email.
+        """
+        raw_token = await self.create_verification_token(user)
+        return f"{settings.frontend_url}/verify-email?token={raw_token}"
+
     async def send_verification_email(self, user: User) -> bool:
         """
         Generate token and send verification email.
@@ -137,11 +152,7 @@ class VerificationService:
             logger.error(f"Cannot send verification email: user {user.id} has no email")
             return False
 
-        # Create token
-        raw_token = await self.create_verification_token(user)
-
-        # Build verification URL
-        verification_url = f"{settings.frontend_url}/verify-email?token={raw_token}"
+        verification_url = await self.create_verification_url(user)
 
         # Send email
         success = await email_service.send_verification_email(
@@ -0,0 +1,341 @@
+"""Tests for admin API endpoints."""
+
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.admin import (
+    StatsSummaryResponse,
+    UpdateBlockRequest,
+    UpdateScheduleRequest,
+    cached_stats,
+    clear_stats_cache,
+    get_daily_activity,
+    get_stats_summary,
+    get_user,
+    get_user_messages,
+    list_users,
+    update_report_schedule,
+    update_user_block_status,
+)
+from app.models.message import Message
+from app.models.session import ChatSession
+from app.models.user import User
+from app.services.auth_service import cache_user_profile, get_cached_user_profile
+
+
+def make_request(headers: dict[str, str] | None = None) -> Request:
+    """Build a bare HTTP request for calling endpoints directly."""
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw_headers})
+
+
+@pytest.fixture(autouse=True)
+def reset_stats_cache():
+    """Keep cached stats from leaking between tests."""
+    clear_stats_cache()
+    yield
+    clear_stats_cache()
+
+
+@pytest.mark.asyncio
+async def test_list_users_includes_message_counts(
+    async_session: AsyncSession,
+    sample_users: list[User],
+    sample_sessions: list[ChatSession],
+    sample_messages: list[Message],
+):
+    """Test that list_users returns per-user message counts."""
+    response = await list_users(admin=sample_users[0], db=async_session)
+
+    counts = {item.email: item.message_count for item in response.users}
+    assert counts == {
+        "admin@example.com": 0,
+        "user1@example.com": 5,  # Only user messages are counted
+        "user2@example.com": 0,
+    }
+    assert response.total == 3
+    assert response.total_pages == 1
+
+
+@pytest.mark.asyncio
+async def test_list_users_filters_and_paginates(
+    async_session: AsyncSession,
+    sample_users: list[User],
+    sample_messages: list[Message],
+):
+    """Test filtering and pagination of the user list."""
+    response = await list_users(
+        admin=sample_users[0], db=async_session, page=1, page_size=1, role="user"
+    )
+
+    assert response.total == 2
+    assert response.total_pages == 2
+    assert len(response.users) == 1
+
+
+@pytest.mark.asyncio
+async def test_list_users_timestamps_match_detail(
+    async_session: AsyncSession,
+    sample_users: list[User],
+):
+    """Test that list timestamps are formatted exactly like the user detail view."""
+    response = await list_users(admin=sample_users[0], db=async_session)
+
+    # Reload users from the database rather than the in-memory fixtures
+    async_session.expire_all()
+    for item in response.users:
+        detail = await get_user(uuid.UUID(item.id), admin=sample_users[0], db=async_session)
+        assert item.created_at == detail.created_at
+        assert item.updated_at == detail.updated_at
+    assert response.users[0].role == "user"
+
+
+@pytest.mark.asyncio
+async def test_list_users_empty_page(async_session: AsyncSession, sample_users: list[User]):
+    """Test that a page past the end returns no users but keeps the total."""
+    response = await list_users(admin=sample_users[0], db=async_session, page=5, page_size=20)
+
+    assert response.users == []
+    assert response.total == 3
+
+
+@pytest.mark.asyncio
+async def test_get_user_message_count_tracks_inserts_and_deletes(
+    async_session: AsyncSession,
+    sample_users: list[User],
+    sample_sessions: list[ChatSession],
+    sample_messages: list[Message],
+):
+    """Test that the users.message_count counter follows message writes."""
+    admin, user = sample_users[0], sample_users[1]
+    user_id = user.id
+    user_message = next(m for m in sample_messages if m.user_id == user_id)
+
+    # Counter is maintained in the database, so reload the user's row
+    async_session.expire(user)
+    response = await get_user(user_id=user_id, admin=admin, db=async_session)
+    assert response.message_count == 5
+
+    await async_session.delete(user_message)
+    await async_session.commit()
+
+    async_session.expire(user)
+    response = await get_user(user_id=user_id, admin=admin, db=async_session)
+    assert response.message_count == 4
+
+
+@pytest.mark.asyncio
+async def test_update_user_block_status(async_session: AsyncSession, sample_users: list[User]):
+    """Test blocking a user returns the updated user and drops their cached profile."""
+    admin, user = sample_users[0], sample_users[1]
+    cache_user_profile(user.id, user.to_dict(include_sensitive=True))
+
+    response = await update_user_block_status(
+        user_id=user.id,
+        data=UpdateBlockRequest(is_blocked=True),
+        admin=admin,
+        db=async_session,
+    )
+
+    assert response.success is True
+    assert response.user.is_blocked is True
+    assert response.user.updated_at >= response.user.created_at
+    assert get_cached_user_profile(user.id) is None
+
+
+@pytest.mark.asyncio
+async def test_update_user_block_status_unknown_user(
+    async_session: AsyncSession, sample_users: list[User]
+):
+    """Test blocking a missing user returns 404."""
+    with pytest.raises(HTTPException) as exc_info:
+        await update_user_block_status(
+            user_id=uuid.uuid4(),
+            data=UpdateBlockRequest(is_blocked=True),
+            admin=sample_users[0],
+            db=async_session,
+        )
+
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_stats_summary(
+    async_session: AsyncSession,
+    sample_users: list[User],
+    sample_messages: list[Message],
+):
+    """Test summary statistics over users and user-sent messages."""
+    response = await get_stats_summary(
+        request=make_request(), response=Response(), admin=sample_users[0], db=async_session
+    )
+
+    assert response.total_users == 3
+    assert response.active_users_7d == 1  # Anonymous messages have no user_id
+    assert response.total_messages == 8  # 5 from User One + 3 anonymous
+    assert response.messages_today == 8
+    assert response.messages_7d == 8
+    assert response.new_users_today == 3
+    assert response.new_users_7d == 3
+
+
+@pytest.mark.asyncio
+async def test_get_daily_activity(
+    async_session: AsyncSession,
+    sample_users: list[User],
+    sample_messages: list[Message],
+):
+    """Test daily activity covers every day and buckets today's activity."""
+    response = await get_daily_activity(
+        request=make_request(),
+        response=Response(),
+        admin=sample_users[0],
+        db=async_session,
+        days=7,
+    )
+
+    assert len(response.data) == 8  # Seven days back plus today
+    assert [item.date for item in response.data] == sorted(item.date for item in response.data)
+    today = response.data[-1]
+    assert today.date == datetime.now(timezone.utc).date().isoformat()
+    assert today.messages == 8
+    assert today.new_users == 3
+    assert sum(item.messages for item in response.data[:-1]) == 0
+
+
+@pytest.mark.asyncio
+async def test_get_stats_summary_is_cached(
+    async_session: AsyncSession,
+    sample_users: list[User],
+    sample_sessions: list[ChatSession],
+):
+    """Test that repeated summary calls reuse the cached result."""
+    first = await get_stats_summary(
+        request=make_request(), response=Response(), admin=sample_users[0], db=async_session
+    )
+
+    async_session.add(
+        Message(
+            session_id=sample_sessions[0].id,
+            user_id=sample_users[1].id,
+            sender="user",
+            content="After first call",
+        )
+    )
+    await async_session.commit()
+
+    cached = await get_stats_summary(
+        request=make_request(), response=Response(), admin=sample_users[0], db=async_session
+    )
+    assert cached is first
+
+    clear_stats_cache()
+    refreshed = await get_stats_summary(
+        request=make_request(), response=Response(), admin=sample_users[0], db=async_session
+    )
+    assert refreshed.total_messages == first.total_messages + 1
+
+
+@pytest.mark.asyncio
+async def test_cached_stats_locks_per_key():
+    """Test that a slow recomputation only holds up callers for the same key."""
+    release = asyncio.Event()
+    calls: list[str] = []
+
+    def compute(name: str, wait: bool):
+        async def run():
+            calls.append(name)
+            if wait:
+                await release.wait()
+            return StatsSummaryResponse.model_construct(total_users=len(calls))
+
+        return run
+
+    slow = asyncio.create_task(cached_stats(("daily_activity", 90), compute("slow", True)))
+    same_key = asyncio.create_task(
+        cached_stats(("daily_activity", 90), compute("duplicate", False))
+    )
+    await asyncio.sleep(0)
+
+    # Another key is served while the slow computation is still running
+    other = await asyncio.wait_for(cached_stats("summary", compute("summary", False)), 1)
+    assert other.total_users == 2
+    assert not slow.done()
+
+    release.set()
+    assert await slow is await same_key
+    assert calls == ["slow", "summary"]
+
+
+@pytest.mark.asyncio
+async def test_get_user_messages_paginates_with_total(
+    async_session: AsyncSession,
+    sample_users: list[User],
+    sample_messages: list[Message],
+):
+    """Test that user messages report the full total on every page."""
+    user = sample_users[1]
+
+    first = await get_user_messages(
+        user_id=user.id, admin=sample_users[0], db=async_session, page=1, page_size=2
+    )
+    past_end = await get_user_messages(
+        user_id=user.id, admin=sample_users[0], db=async_session, page=4, page_size=2
+    )
+
+    assert len(first.messages) == 2
+    assert first.total == 5
+    assert first.total_pages == 3
+    assert past_end.messages == []
+    assert past_end.total == 5
+
+
+@pytest.mark.asyncio
+async def test_update_report_schedule_creates_and_updates(
+    async_session: AsyncSession,
+    sample_users: list[User],
+):
+    """Test that schedule updates are returned without a refresh."""
+    # Disabled schedules never start the background scheduler
+    data = UpdateScheduleRequest(enabled=False, day_of_week="fri", hour=7)
+
+    created = await update_report_schedule(data=data, admin=sample_users[0], db=async_session)
+    updated = await update_report_schedule(
+        data=UpdateScheduleRequest(minute=30), admin=sample_users[0], db=async_session
+    )
+
+    assert created.day_of_week == "fri"
+    assert created.hour == 7
+    assert created.updated_at is not None
+    assert updated.hour == 7
+    assert updated.minute == 30
+    assert updated.updated_at >= created.updated_at
+
+
+@pytest.mark.asyncio
+async def test_get_stats_summary_honors_etag(
+    async_session: AsyncSession,
+    sample_users: list[User],
+):
+    """Test that a matching If-None-Match yields 304 without a body."""
+    response = Response()
+    await get_stats_summary(
+        request=make_request(), response=response, admin=sample_users[0], db=async_session
+    )
+    etag = response.headers["etag"]
+
+    not_modified = await get_stats_summary(
+        request=make_request({"If-None-Match": etag}),
+        response=Response(),
+        admin=sample_users[0],
+        db=async_session,
+    )
+
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.body == b""
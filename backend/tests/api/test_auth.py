@@ -0,0 +1,94 @@
+"""Tests for authentication API helpers."""
+
+import json
+
+import pytest
+from fastapi import Request, Response
+
+from app.api.auth import (
+    clear_auth_cookies,
+    get_auth_methods,
+    get_client_info,
+    get_current_user,
+    get_providers,
+    is_frontend_redirect,
+    set_auth_cookies,
+    token_response,
+)
+from app.config import settings
+from app.services.oauth_service import oauth_service
+
+
+def test_is_frontend_redirect():
+    """Test that only URLs under the frontend URL are accepted as redirects."""
+    assert is_frontend_redirect(settings.frontend_url)
+    assert is_frontend_redirect(f"{settings.frontend_url}/chat?tab=1")
+    assert not is_frontend_redirect("https://evil.example.com/")
+    assert not is_frontend_redirect(settings.frontend_url[:-1])
+    assert not is_frontend_redirect("")
+
+
+def test_get_client_info():
+    """Test reading the user agent and client IP from the ASGI scope."""
+    request = Request(
+        {
+            "type": "http",
+            "headers": [(b"accept", b"*/*"), (b"user-agent", b"pytest/1.0")],
+            "client": ("203.0.113.7", 5000),
+        }
+    )
+    assert get_client_info(request) == ("pytest/1.0", "203.0.113.7")
+    assert get_client_info(Request({"type": "http", "headers": []})) == (None, None)
+
+
+def test_set_auth_cookies():
+    """Test that both auth cookies are appended with their paths and attributes."""
+    response = Response()
+
+    set_auth_cookies(response, "access.jwt", "refresh-token")
+
+    assert response.headers.getlist("set-cookie") == [
+        "access_token=access.jwt; Max-Age=1800; Path=/; HttpOnly; SameSite=lax",
+        "refresh_token=refresh-token; Max-Age=604800; Path=/api/auth; HttpOnly; SameSite=lax",
+    ]
+
+
+def test_clear_auth_cookies():
+    """Test that both auth cookies are expired on the paths they were set with."""
+    response = Response()
+
+    clear_auth_cookies(response)
+
+    assert response.headers.getlist("set-cookie") == [
+        "access_token=; Max-Age=0; Path=/; HttpOnly; SameSite=lax",
+        "refresh_token=; Max-Age=0; Path=/api/auth; HttpOnly; SameSite=lax",
+    ]
+
+
+def test_token_response():
+    """Test that token responses carry the TokenResponse body and both cookies."""
+    response = token_response("access.jwt", "refresh-token", {"id": "1"})
+
+    assert json.loads(response.body) == {
+        "access_token": "access.jwt",
+        "token_type": "bearer",
+        "expires_in": settings.jwt_access_token_expire_minutes * 60,
+        "user": {"id": "1"},
+    }
+    assert len(response.headers.getlist("set-cookie")) == 2
+
+
+@pytest.mark.asyncio
+async def test_static_auth_responses():
+    """Test that pre-serialized auth responses match the documented shapes."""
+    providers = oauth_service.get_configured_providers()
+
+    assert json.loads((await get_providers()).body) == {"providers": providers}
+    assert json.loads((await get_auth_methods()).body) == {
+        "oauth_providers": providers,
+        "email_password_enabled": True,
+    }
+
+    response = await get_current_user(request=None, access_token=None, db=None)
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {"user": None, "authenticated": False}
@@ -0,0 +1,31 @@
+"""Tests for shared API response classes."""
+
+import json
+import uuid
+from datetime import datetime, timezone
+
+from app.api.responses import FastJSONResponse
+
+
+def test_fast_json_response_matches_json_response_output():
+    """Test that rendering matches Starlette's compact JSON output."""
+    content = {"name": "Zoë", "items": [1, 2.5, None, True], "nested": {"empty": []}}
+
+    response = FastJSONResponse(content)
+
+    expected = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    assert response.body == expected
+    assert response.media_type == "application/json"
+
+
+def test_fast_json_response_serializes_uuid_and_datetime():
+    """Test that UUIDs and datetimes serialize without manual conversion."""
+    user_id = uuid.uuid4()
+    created_at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    response = FastJSONResponse({"id": user_id, "created_at": created_at})
+
+    assert json.loads(response.body) == {
+        "id": str(user_id),
+        "created_at": "2026-01-02T03:04:05Z",
+    }
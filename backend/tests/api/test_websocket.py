@@ -0,0 +1,346 @@
+"""Tests for WebSocket connection management."""
+
+import asyncio
+import json
+import uuid
+from collections import deque
+from contextlib import nullcontext
+from functools import partial
+from unittest.mock import patch
+
+import pytest
+
+from app.api import websocket as websocket_api
+from app.api.websocket import (
+    DEFAULT_LIMIT_EXCEEDED_MESSAGE,
+    HISTORY_MAX_MESSAGES,
+    SEND_DRAIN_TIMEOUT_SECONDS,
+    SEND_QUEUE_MAX_FRAMES,
+    VERIFICATION_REQUIRED_MESSAGE,
+    ConnectionManager,
+    _get_limit_exceeded_message,
+    encode_stream_chunk,
+    recent_history,
+    websocket_endpoint,
+)
+from app.dependencies import USER_ID_COOKIE
+from app.services.message_limits import MessageLimitInfo
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a WebSocket that records sent frames."""
+
+    def __init__(self, fail: bool = False, stalled: bool = False):
+        self.sent: list[str] = []
+        self.fail = fail
+        self.stalled = stalled
+
+    async def send_text(self, data: str):
+        if self.fail:
+            raise RuntimeError("connection closed")
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.sent.append(data)
+
+
+class FakeClientWebSocket(FakeWebSocket):
+    """Stand-in for a client connection that replays scripted inbound messages."""
+
+    def __init__(self, incoming: list, expected_frames: int = 3):
+        super().__init__()
+        self.cookies = {USER_ID_COOKIE: "cookie-1"}
+        self.incoming = incoming
+        self.expected_frames = expected_frames
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        # Yield first, like a real socket write, so unordered sends can overtake
+        await asyncio.sleep(0)
+        await super().send_text(data)
+
+    async def receive(self) -> dict:
+        item = self.incoming.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        if item is None:
+            # Disconnect only once every expected frame has been delivered
+            for _ in range(200):
+                if len(self.sent) >= self.expected_frames:
+                    break
+                await asyncio.sleep(0)
+            return {"type": "websocket.disconnect", "code": 1000}
+        return {"type": "websocket.receive", "text": item}
+
+
+class FakeLimitsService:
+    """MessageLimitsService replacement that counts the user messages saved so far."""
+
+    def __init__(self, db, saved: list[tuple] = ()):
+        self.saved = saved
+
+    async def get_limit_info(self, cookie_user_id=None, auth_user_id=None):
+        used = sum(1 for sender, _ in self.saved if sender == "user")
+        return MessageLimitInfo(
+            limit=5,
+            used=used,
+            remaining=5 - used,
+            is_unlimited=False,
+            can_send=used < 5,
+            user_role="anonymous",
+        )
+
+    async def check_can_send(self, cookie_user_id=None, auth_user_id=None):
+        limit_info = await self.get_limit_info(cookie_user_id, auth_user_id)
+        return limit_info.can_send, limit_info
+
+
+async def fake_response_stream(message, conversation_history=None):
+    """AI stream replacement that answers every message with two chunks."""
+    yield "Hello"
+    yield " there"
+
+
+async def run_endpoint(websocket: FakeClientWebSocket, save_user_message=None) -> list[tuple]:
+    """Run websocket_endpoint against a fake client with the database and AI patched out.
+
+    Returns the (sender, content) pairs that were saved, in the order the saves finished.
+    """
+    history = [{"type": "message", "sender": "user", "content": "earlier"}]
+    saved: list[tuple] = []
+
+    async def get_or_create_session(user_id, session_id):
+        return uuid.uuid4(), history
+
+    async def record_user_message(session_id, content, user_id=None):
+        saved.append(("user", content))
+
+    async def save_assistant_message(session_id, content, meta=None):
+        saved.append(("assistant", content))
+
+    chat_service = websocket_api.chat_service
+    limits_service = partial(FakeLimitsService, saved=saved)
+    with (
+        patch.object(chat_service, "get_or_create_session", get_or_create_session),
+        patch.object(chat_service, "save_user_message", save_user_message or record_user_message),
+        patch.object(chat_service, "save_assistant_message", save_assistant_message),
+        patch.object(websocket_api.ai_service, "generate_response_stream", fake_response_stream),
+        patch.object(websocket_api, "async_session_maker", nullcontext),
+        patch.object(websocket_api, "MessageLimitsService", limits_service),
+    ):
+        await websocket_endpoint(websocket, session_id=None)
+
+    return saved
+
+
+async def drain_writers():
+    """Give the per-connection writer tasks a chance to send queued frames."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_to_session_sends_same_frame_to_each_connection():
+    """Test that a broadcast reaches every connection in the session only."""
+    manager = ConnectionManager()
+    session_id = uuid.uuid4()
+    first, second, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    manager.register(first, session_id, "cookie-1", None, [])
+    manager.register(second, session_id, "cookie-2", None, [])
+    manager.register(other, uuid.uuid4(), "cookie-3", None, [])
+
+    await manager.broadcast_to_session(session_id, {"type": "message", "content": "héllo"})
+    await drain_writers()
+
+    assert first.sent == second.sent
+    assert json.loads(first.sent[0]) == {"type": "message", "content": "héllo"}
+    assert other.sent == []
+
+
+@pytest.mark.asyncio
+async def test_broadcast_to_session_drops_failed_connections():
+    """Test that a failing connection is removed without blocking the others."""
+    manager = ConnectionManager()
+    session_id = uuid.uuid4()
+    broken, healthy = FakeWebSocket(fail=True), FakeWebSocket()
+    manager.register(broken, session_id, "cookie-1", None, [])
+    manager.register(healthy, session_id, "cookie-2", None, [])
+
+    await manager.broadcast_to_session(session_id, {"type": "typing"})
+    await drain_writers()
+
+    assert len(healthy.sent) == 1
+    assert manager.get_session_info(broken) is None
+    assert manager.session_connections[session_id] == {healthy}
+
+
+@pytest.mark.asyncio
+async def test_broadcast_to_session_drops_oldest_frames_for_stalled_client():
+    """Test that a stalled client keeps only its newest frames and doesn't block others."""
+    manager = ConnectionManager()
+    session_id = uuid.uuid4()
+    stalled, healthy = FakeWebSocket(stalled=True), FakeWebSocket()
+    manager.register(stalled, session_id, "cookie-1", None, [])
+    manager.register(healthy, session_id, "cookie-2", None, [])
+
+    for n in range(SEND_QUEUE_MAX_FRAMES * 2):
+        await manager.broadcast_frame_to_session(session_id, str(n))
+        await drain_writers()
+
+    queue = manager.send_queues[stalled]
+    assert queue.qsize() == SEND_QUEUE_MAX_FRAMES
+    assert queue.get_nowait() == str(SEND_QUEUE_MAX_FRAMES)
+    assert len(healthy.sent) == SEND_QUEUE_MAX_FRAMES * 2
+
+    manager.disconnect(stalled)
+    manager.disconnect(healthy)
+
+
+@pytest.mark.asyncio
+async def test_flush_and_disconnect_returns_after_failed_send():
+    """Test that a failed send releases queued frames instead of stalling the flush."""
+    manager = ConnectionManager()
+    broken = FakeWebSocket(fail=True)
+    manager.register(broken, uuid.uuid4(), "cookie-1", None, [])
+
+    await manager.send_frame_to_client(broken, "first")
+    await manager.send_frame_to_client(broken, "second")
+    started = asyncio.get_running_loop().time()
+    await manager.flush_and_disconnect(broken)
+
+    assert asyncio.get_running_loop().time() - started < SEND_DRAIN_TIMEOUT_SECONDS / 2
+    assert manager.get_session_info(broken) is None
+
+
+@pytest.mark.asyncio
+async def test_create_background_task_keeps_task_until_done():
+    """Test that background tasks are referenced only while they run."""
+    manager = ConnectionManager()
+    release = asyncio.Event()
+
+    async def save():
+        await release.wait()
+
+    task = manager.create_background_task(save())
+    assert manager.pending_tasks == {task}
+
+    release.set()
+    await task
+    await asyncio.sleep(0)
+    assert manager.pending_tasks == set()
+
+
+@pytest.mark.asyncio
+async def test_register_returns_capped_history():
+    """Test that the registered history is shared and capped at the newest messages."""
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+    loaded = [{"type": "message", "sender": "user", "content": "loaded"}]
+    history = manager.register(websocket, uuid.uuid4(), "cookie-1", None, loaded)
+    assert list(history) == [("user", "loaded")]
+
+    for n in range(HISTORY_MAX_MESSAGES):
+        history.append(("assistant", str(n)))
+
+    assert manager.get_session_info(websocket)[3] is history
+    assert len(history) == HISTORY_MAX_MESSAGES
+    assert history[0] == ("assistant", "0")
+    assert history[-1] == ("assistant", str(HISTORY_MAX_MESSAGES - 1))
+
+    manager.disconnect(websocket)
+
+
+def test_recent_history_returns_latest_messages():
+    """Test that recent_history yields only the newest messages, oldest first."""
+    history = deque([("user", str(n)) for n in range(5)], maxlen=HISTORY_MAX_MESSAGES)
+
+    assert list(recent_history(history, 2)) == [("user", "3"), ("user", "4")]
+    assert list(recent_history(history, 10)) == [("user", str(n)) for n in range(5)]
+    assert list(recent_history(deque(), 2)) == []
+
+
+@pytest.mark.parametrize(
+    "content", ["Hello", 'quote " and \\ backslash', "line\nbreak", "ünïcode ✓", ""]
+)
+def test_encode_stream_chunk_matches_full_encoding(content):
+    """Test that the prefixed stream frame decodes to the full ai_stream message."""
+    assert json.loads(encode_stream_chunk(content)) == {
+        "type": "ai_stream",
+        "sender": "assistant",
+        "content": content,
+    }
+
+
+def test_get_limit_exceeded_message():
+    """Test that limit notices depend on role, with verification taking priority."""
+    assert "sign in" in _get_limit_exceeded_message("anonymous")
+    assert "dremdem.ru" in _get_limit_exceeded_message("user")
+    assert _get_limit_exceeded_message("admin") == DEFAULT_LIMIT_EXCEEDED_MESSAGE
+    assert _get_limit_exceeded_message("user", True) == VERIFICATION_REQUIRED_MESSAGE
+
+
+@pytest.mark.asyncio
+async def test_invalid_json_reply_is_sent_after_queued_frames():
+    """Test that the invalid format reply keeps its place behind queued frames."""
+    websocket = FakeClientWebSocket(["not json", None])
+
+    await run_endpoint(websocket)
+
+    frames = [json.loads(frame) for frame in websocket.sent]
+    assert [frame["type"] for frame in frames] == ["system", "history", "error"]
+    assert frames[2]["content"] == "Invalid message format"
+
+
+@pytest.mark.asyncio
+async def test_server_error_frame_is_delivered_after_queued_frames():
+    """Test that queued frames and the error frame go out before the connection is dropped."""
+    websocket = FakeClientWebSocket([RuntimeError("boom")])
+
+    await run_endpoint(websocket)
+
+    frames = [json.loads(frame) for frame in websocket.sent]
+    assert [frame["type"] for frame in frames] == ["system", "history", "error"]
+    assert frames[2]["content"] == "Server error: boom"
+    assert websocket_api.manager.get_session_info(websocket) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_message_save_is_logged_not_raised(caplog):
+    """Test that a save failing in the background is logged when the client leaves."""
+
+    async def save_user_message(session_id, content, user_id=None):
+        raise RuntimeError("db down")
+
+    websocket = FakeClientWebSocket(['{"content": "hi"}', None], expected_frames=7)
+
+    saved = await run_endpoint(websocket, save_user_message=save_user_message)
+
+    assert saved == []
+    assert json.loads(websocket.sent[-1])["type"] == "limit_update"
+    assert "Background task failed" in caplog.text
+    assert "Failed to save messages for disconnected client: db down" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_full_turn_streams_reply_and_reports_updated_limit():
+    """Test that a turn saves both messages and reports the limit the database would."""
+    websocket = FakeClientWebSocket(['{"content": "hi"}', None], expected_frames=7)
+
+    saved = await run_endpoint(websocket)
+
+    frames = [json.loads(frame) for frame in websocket.sent]
+    assert [frame["type"] for frame in frames] == [
+        "system",
+        "history",
+        "message",
+        "typing",
+        "ai_stream",
+        "ai_stream_end",
+        "limit_update",
+    ]
+    assert saved == [("user", "hi"), ("assistant", "Hello there")]
+
+    limit_info = await FakeLimitsService(None, saved).get_limit_info()
+    assert frames[-1]["limit_info"] == limit_info.to_dict()
+    assert frames[-1]["limit_info"]["used"] == 1
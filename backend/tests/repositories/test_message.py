@@ -0,0 +1,40 @@
+"""Tests for MessageRepository."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.message import Message
+from app.models.session import ChatSession
+from app.repositories.message import MessageRepository
+
+
+@pytest.mark.asyncio
+async def test_to_conversation_history_returns_latest_in_order(
+    async_session: AsyncSession, sample_sessions: list[ChatSession]
+):
+    """Test that history holds the newest messages, oldest first."""
+    session_id = sample_sessions[0].id
+    start = datetime.now(timezone.utc)
+    for i in range(5):
+        async_session.add(
+            Message(
+                id=uuid.uuid4(),
+                session_id=session_id,
+                sender="user" if i % 2 == 0 else "assistant",
+                content=f"Message {i}",
+                created_at=start + timedelta(seconds=i),
+                updated_at=start + timedelta(seconds=i),
+            )
+        )
+    await async_session.commit()
+
+    history = await MessageRepository(async_session).to_conversation_history(session_id, limit=3)
+
+    assert history == [
+        {"type": "message", "sender": "user", "content": "Message 2"},
+        {"type": "message", "sender": "assistant", "content": "Message 3"},
+        {"type": "message", "sender": "user", "content": "Message 4"},
+    ]
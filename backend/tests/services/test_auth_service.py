@@ -0,0 +1,54 @@
+"""Tests for the /me profile cache in auth_service."""
+
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from app.services import auth_service
+from app.services.auth_service import (
+    cache_user_profile,
+    get_cached_user_profile,
+    invalidate_user_profile,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_profile_cache():
+    """Start every test with an empty profile cache."""
+    auth_service._user_profiles.clear()
+    yield
+    auth_service._user_profiles.clear()
+
+
+def test_cached_profile_is_returned_until_invalidated():
+    """Test that a cached profile is served until it is invalidated."""
+    user_id = uuid.uuid4()
+    cache_user_profile(user_id, {"id": str(user_id)})
+
+    assert get_cached_user_profile(user_id) == {"id": str(user_id)}
+
+    invalidate_user_profile(user_id)
+    assert get_cached_user_profile(user_id) is None
+
+
+def test_cached_profile_expires_after_ttl():
+    """Test that profiles are dropped once their TTL has passed."""
+    user_id = uuid.uuid4()
+    cache_user_profile(user_id, {"id": str(user_id)})
+
+    with patch("app.services.auth_service.monotonic", return_value=float("inf")):
+        assert get_cached_user_profile(user_id) is None
+
+    assert user_id not in auth_service._user_profiles
+
+
+def test_profile_cache_evicts_oldest_entry_when_full():
+    """Test that the cache stays bounded by evicting its oldest entry."""
+    user_ids = [uuid.uuid4() for _ in range(3)]
+
+    with patch.object(auth_service, "USER_PROFILE_CACHE_MAX_SIZE", 2):
+        for user_id in user_ids:
+            cache_user_profile(user_id, {"id": str(user_id)})
+
+    assert list(auth_service._user_profiles) == user_ids[1:]
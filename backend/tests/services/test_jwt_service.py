@@ -0,0 +1,54 @@
+"""Tests for JWTService."""
+
+import uuid
+from unittest.mock import patch
+
+from app.services.jwt_service import JWTService
+
+
+def test_get_user_id_from_token_caches_valid_tokens():
+    """Test that a valid token is decoded once and then served from cache."""
+    service = JWTService()
+    user_id = uuid.uuid4()
+    token = service.create_access_token(user_id, "user")
+
+    with patch.object(service, "verify_access_token", wraps=service.verify_access_token) as spy:
+        assert service.get_user_id_from_token(token) == user_id
+        assert service.get_user_id_from_token(token) == user_id
+
+    assert spy.call_count == 1
+
+
+def test_get_user_id_from_token_drops_expired_cache_entries():
+    """Test that cached tokens are re-verified once past their expiry."""
+    service = JWTService()
+    token = service.create_access_token(uuid.uuid4(), "user")
+    service.get_user_id_from_token(token)
+
+    with patch("app.services.jwt_service.time.time", return_value=float("inf")):
+        with patch.object(service, "verify_access_token", return_value=None):
+            assert service.get_user_id_from_token(token) is None
+
+    assert token not in service._token_cache
+
+
+def test_get_user_id_from_token_rejects_invalid_tokens():
+    """Test that invalid tokens return None and are not cached."""
+    service = JWTService()
+
+    assert service.get_user_id_from_token("not-a-jwt") is None
+    assert service._token_cache == {}
+
+
+def test_verify_oauth_state_token():
+    """Test that the state cookie only verifies against its own state."""
+    service = JWTService()
+    token = service.create_oauth_state_token("abc", "http://localhost:3000/chat", 600)
+
+    payload = service.verify_oauth_state_token(token, "abc")
+    assert payload["redirect"] == "http://localhost:3000/chat"
+    assert service.verify_oauth_state_token(token, "abd") is None
+    assert service.verify_oauth_state_token(token[:-2], "abc") is None
+
+    access_token = service.create_access_token(uuid.uuid4(), "user")
+    assert service.verify_oauth_state_token(access_token, "abc") is None
@@ -0,0 +1,36 @@
+"""Tests for MessageLimitInfo bookkeeping."""
+
+from app.services.message_limits import MessageLimitInfo
+
+
+def make_info(limit: int | None, used: int, requires_verification: bool = False):
+    """Build limit info the way MessageLimitsService.get_limit_info does."""
+    remaining = None if limit is None else max(0, limit - used)
+    return MessageLimitInfo(
+        limit=limit,
+        used=used,
+        remaining=remaining,
+        is_unlimited=limit is None,
+        can_send=(remaining is None or remaining > 0) and not requires_verification,
+        user_role="user",
+        requires_verification=requires_verification,
+    )
+
+
+def test_after_message_sent_counts_message():
+    """Test that sending a message uses up one of the remaining messages."""
+    assert make_info(5, 3).after_message_sent() == make_info(5, 4)
+
+
+def test_after_message_sent_reaching_limit_blocks_sending():
+    """Test that the last allowed message leaves the user unable to send."""
+    info = make_info(5, 4).after_message_sent()
+
+    assert info == make_info(5, 5)
+    assert info.remaining == 0
+    assert info.can_send is False
+
+
+def test_after_message_sent_unlimited():
+    """Test that unlimited users only have their usage counted."""
+    assert make_info(None, 10).after_message_sent() == make_info(None, 11)
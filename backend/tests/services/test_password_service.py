@@ -0,0 +1,28 @@
+"""Tests for password validation."""
+
+import pytest
+
+from app.services.password_service import VALID_PASSWORD_PATTERN, validate_password_strength
+
+
+@pytest.mark.parametrize(
+    ("password", "error"),
+    [
+        ("abcdefg1", None),
+        ("пароль12", None),
+        ("has spaces 1\n", None),
+        ("a1" * 36, None),
+        ("abc1", "Password must be at least 8 characters"),
+        ("a1" * 36 + "x", "Password must not exceed 72 characters"),
+        ("12345678", "Password must contain at least one letter"),
+        ("abcdefgh", "Password must contain at least one number"),
+        ("________", "Password must contain at least one letter"),
+        ("²²²²²²²1", "Password must contain at least one letter"),
+    ],
+)
+def test_validate_password_strength(password, error):
+    """Test that the fast path and the detailed checks agree."""
+    assert validate_password_strength(password) == (error is None, error)
+    # The fast path may only accept passwords the detailed checks accept
+    if VALID_PASSWORD_PATTERN.fullmatch(password):
+        assert error is None
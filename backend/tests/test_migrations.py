@@ -0,0 +1,26 @@
+"""Sanity checks for the Alembic revision chain."""
+
+import ast
+from collections import Counter
+from pathlib import Path
+
+VERSIONS_DIR = Path(__file__).resolve().parent.parent / "alembic" / "versions"
+
+
+def get_revision_id(path: Path) -> str | None:
+    """Read the module-level ``revision`` assignment from a migration file."""
+    for node in ast.parse(path.read_text()).body:
+        if isinstance(node, ast.AnnAssign | ast.Assign):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            if any(isinstance(t, ast.Name) and t.id == "revision" for t in targets):
+                return ast.literal_eval(node.value)
+    return None
+
+
+def test_revision_ids_are_unique():
+    """Test that no two migration files share a revision id."""
+    revisions = Counter(get_revision_id(path) for path in VERSIONS_DIR.glob("*.py"))
+
+    duplicates = [rev for rev, count in revisions.items() if count > 1]
+    assert duplicates == []
+    assert None not in revisions